@@ -0,0 +1,180 @@
+# Zone and Line Analytics Module
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# Counts objects crossing lines and measures how long objects of each class
+# stay inside polygon zones, updated every frame from the tracker's current
+# and previous positions. Only the active tracks are kept between frames, so
+# the work per frame depends on the number of tracks, not on how long the
+# session has been running.
+#
+# Rules are loaded from a JSON file (see analytics_rules.json):
+# {
+#     "report_every_seconds": 10,
+#     "lines": [{"name": "entrance", "points": [[x1, y1], [x2, y2]], "classes": ["car"]}],
+#     "zones": [{"name": "parking", "polygon": [[x, y], ...], "classes": []}]
+# }
+# An empty or missing "classes" list means all classes.
+# Line crossings are counted per direction: "forward" is a move to the
+# right-hand side of the line as seen on screen when walking from its first
+# point to its second, "backward" the opposite.
+
+import json
+
+import cv2
+import numpy as np
+
+
+def load_rules(rules_path):
+    with open(rules_path, "r") as file_object:
+        return json.load(file_object)
+
+
+def class_filter(rule, classes):
+    """Boolean mask over class ids for a rule's 'classes' list"""
+    names = rule.get('classes') or []
+    if not names:
+        return np.ones(len(classes), dtype=bool)
+    return np.array([class_name in names for class_name in classes], dtype=bool)
+
+
+class ZoneAnalytics:
+    def __init__(self, rules, classes, frame_size):
+        self.classes = classes
+        self.report_every = float(rules.get('report_every_seconds', 10))
+        self.last_report_time = None
+        frame_width, frame_height = frame_size
+        self.frame_width, self.frame_height = frame_width, frame_height
+
+        # Lines: (L, 2, 2) end points and per-line class masks (L, C)
+        self.lines = rules.get('lines', [])
+        self.line_points = np.array([line['points'] for line in self.lines], dtype=np.float64).reshape(-1, 2, 2)
+        self.line_classes = np.array([class_filter(line, classes) for line in self.lines],
+                                     dtype=bool).reshape(-1, len(classes))
+        self.crossings = np.zeros((len(self.lines), len(classes), 2), dtype=np.int64)  # forward, backward
+
+        # Zones: one precomputed mask per polygon, point lookups are then O(1)
+        self.zones = rules.get('zones', [])
+        self.zone_masks = np.zeros((len(self.zones), frame_height, frame_width), dtype=bool)
+        for i, zone in enumerate(self.zones):
+            mask = np.zeros((frame_height, frame_width), dtype=np.uint8)
+            cv2.fillPoly(mask, [np.array(zone['polygon'], dtype=np.int32)], 1)
+            self.zone_masks[i] = mask.astype(bool)
+        self.zone_classes = np.array([class_filter(zone, classes) for zone in self.zones],
+                                     dtype=bool).reshape(-1, len(classes))
+        self.dwell_seconds = np.zeros((len(self.zones), len(classes)), dtype=np.float64)
+        self.zone_entries = np.zeros((len(self.zones), len(classes)), dtype=np.int64)
+
+        # State of the tracks seen in the previous frame only
+        self.prev_ids = np.zeros(0, dtype=np.int64)
+        self.prev_points = np.zeros((0, 2), dtype=np.float64)
+        self.prev_inside = np.zeros((len(self.zones), 0), dtype=bool)
+        self.prev_class_ids = np.zeros(0, dtype=np.int64)
+        self.prev_time = None
+
+    def update(self, tracking_objects, object_info, timestamp):
+        """Evaluate all rules for the current frame; returns a report when one is due"""
+        ids = np.fromiter(tracking_objects.keys(), dtype=np.int64, count=len(tracking_objects))
+        points = np.array(list(tracking_objects.values()), dtype=np.float64).reshape(-1, 2)
+        class_ids = np.array([object_info[object_id]['class_id'] if object_id in object_info else -1
+                              for object_id in tracking_objects], dtype=np.int64)
+        known_class = class_ids >= 0
+        dt = 0.0 if self.prev_time is None else max(0.0, timestamp - self.prev_time)
+
+        # Row of each current track in the previous frame's arrays (if it was there)
+        has_prev = np.zeros(len(ids), dtype=bool)
+        prev_rows = np.zeros(len(ids), dtype=np.int64)
+        if len(self.prev_ids) > 0 and len(ids) > 0:
+            order = np.argsort(self.prev_ids)
+            sorted_prev_ids = self.prev_ids[order]
+            positions = np.minimum(np.searchsorted(sorted_prev_ids, ids), len(sorted_prev_ids) - 1)
+            has_prev = sorted_prev_ids[positions] == ids
+            prev_rows = order[positions]
+
+        if len(self.lines) > 0 and has_prev.any():
+            self._count_crossings(self.prev_points[prev_rows[has_prev]], points[has_prev],
+                                  class_ids[has_prev], known_class[has_prev])
+
+        inside = np.zeros((len(self.zones), len(ids)), dtype=bool)
+        if len(self.zones) > 0 and len(ids) > 0:
+            xs = np.clip(points[:, 0].astype(np.int64), 0, self.frame_width - 1)
+            ys = np.clip(points[:, 1].astype(np.int64), 0, self.frame_height - 1)
+            in_frame = ((points[:, 0] >= 0) & (points[:, 0] < self.frame_width) &
+                        (points[:, 1] >= 0) & (points[:, 1] < self.frame_height))
+            inside = self.zone_masks[:, ys, xs] & in_frame & known_class
+            inside &= self.zone_classes[:, np.maximum(class_ids, 0)]
+
+            # Dwell time per zone and class
+            for zone_index in range(len(self.zones)):
+                np.add.at(self.dwell_seconds[zone_index], class_ids[inside[zone_index]], dt)
+
+            # Entries: inside now, not inside (or not tracked) in the previous frame
+            was_inside = np.zeros_like(inside)
+            was_inside[:, has_prev] = self.prev_inside[:, prev_rows[has_prev]]
+            entered = inside & ~was_inside
+            for zone_index in range(len(self.zones)):
+                np.add.at(self.zone_entries[zone_index], class_ids[entered[zone_index]], 1)
+
+        self.prev_ids = ids
+        self.prev_points = points
+        self.prev_class_ids = class_ids
+        self.prev_inside = inside
+        self.prev_time = timestamp
+
+        if self.last_report_time is None:
+            self.last_report_time = timestamp
+        if timestamp - self.last_report_time >= self.report_every:
+            self.last_report_time = timestamp
+            return self.report(timestamp)
+        return None
+
+    def _count_crossings(self, starts, ends, class_ids, known_class):
+        """Vectorized segment intersection of every track move with every line"""
+        a = self.line_points[:, None, 0, :]           # (L, 1, 2)
+        b = self.line_points[:, None, 1, :]
+        p = starts[None, :, :]                         # (1, M, 2)
+        q = ends[None, :, :]
+
+        def cross(u, v):
+            return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+        side_start = cross(b - a, p - a) > 0           # (L, M)
+        side_end = cross(b - a, q - a) > 0
+        line_side_a = cross(q - p, a - p)
+        line_side_b = cross(q - p, b - p)
+        crossed = (side_start != side_end) & (line_side_a * line_side_b <= 0)
+        crossed &= known_class[None, :]
+        crossed &= self.line_classes[:, np.maximum(class_ids, 0)]
+
+        # Direction index: 0 = forward (moved to the positive side), 1 = backward
+        direction = np.where(side_end, 0, 1)
+        line_indices, track_indices = np.nonzero(crossed)
+        np.add.at(self.crossings, (line_indices, class_ids[track_indices],
+                                   direction[line_indices, track_indices]), 1)
+
+    def report(self, timestamp):
+        """Cumulative counts per rule and class (only classes with activity)"""
+        lines = {}
+        for i, line in enumerate(self.lines):
+            lines[line['name']] = {
+                self.classes[c]: {'forward': int(self.crossings[i, c, 0]), 'backward': int(self.crossings[i, c, 1])}
+                for c in np.flatnonzero(self.crossings[i].sum(axis=1))
+            }
+        zones = {}
+        for i, zone in enumerate(self.zones):
+            zones[zone['name']] = {
+                self.classes[c]: {'entries': int(self.zone_entries[i, c]),
+                                  'dwell_seconds': round(float(self.dwell_seconds[i, c]), 2),
+                                  'inside_now': int(np.sum(self.prev_inside[i] & (self.prev_class_ids == c)))}
+                for c in np.flatnonzero((self.zone_entries[i] > 0) | (self.dwell_seconds[i] > 0))
+            }
+        return {'time': round(float(timestamp), 2), 'lines': lines, 'zones': zones}
+
+    def draw(self, frame):
+        """Draw lines and zone outlines on a frame"""
+        for zone in self.zones:
+            cv2.polylines(frame, [np.array(zone['polygon'], dtype=np.int32)], True, (255, 0, 255), 2)
+        for line in self.lines:
+            (x1, y1), (x2, y2) = line['points']
+            cv2.line(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
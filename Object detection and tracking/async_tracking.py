@@ -0,0 +1,146 @@
+# Async Object Tracking API
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# Tracking as an async generator for asyncio services:
+#
+#     od = ObjectDetection()
+#     async for result in track_stream("video.mp4", od):
+#         print(result['frame_index'], result['tracking_objects'])
+#
+# Frame capture and inference run in executor threads, so the event loop is
+# never blocked. Several streams can run in one event loop and share one
+# ObjectDetection: its calls are serialized with a lock because an OpenCV
+# network must not be used from two threads at once. Closing the generator
+# (break, aclose() or task cancellation) stops the capture thread and
+# releases the VideoCapture. Wrap the generator in contextlib.aclosing() to
+# release it right away when breaking out of the loop early.
+
+import asyncio
+import sys
+import threading
+import weakref
+
+import cv2
+
+from centroid_tracker import CentroidTracker, detections_to_objects
+from object_detection import ObjectDetection
+
+# One lock per ObjectDetection instance, shared by all streams using it
+_detector_locks = weakref.WeakKeyDictionary()
+_detector_locks_guard = threading.Lock()
+
+
+def _detector_lock(od):
+    with _detector_locks_guard:
+        if od not in _detector_locks:
+            _detector_locks[od] = threading.Lock()
+        return _detector_locks[od]
+
+
+def _detect(od, frame, nmsThreshold, confThreshold):
+    with _detector_lock(od):
+        return od.detect(frame, nmsThreshold=nmsThreshold, confThreshold=confThreshold)
+
+
+async def _read_frames(cap, queue, stop, executor):
+    """Read frames in an executor thread and hand them to the consumer through the queue"""
+    loop = asyncio.get_running_loop()
+    try:
+        while not stop.is_set():
+            ret, frame = await loop.run_in_executor(executor, cap.read)
+            if not ret:
+                break
+            await queue.put(frame)
+    finally:
+        # None marks the end of the stream
+        if not stop.is_set():
+            await queue.put(None)
+
+
+async def track_stream(source, od=None, max_distance=50, max_trajectory_points=30,
+                       prefetch_frames=2, executor=None, nmsThreshold=None, confThreshold=None):
+    """Track objects in a video source and yield one result per frame
+
+    source:          video file, camera index or stream URL (anything cv2.VideoCapture accepts)
+    od:              ObjectDetection to use (can be shared between streams); created if None
+    prefetch_frames: frames read ahead while the previous frame is in inference
+    executor:        concurrent.futures executor for capture and inference
+                     (None uses the event loop's default thread pool)
+
+    Each result is a dict with 'frame_index', 'frame', 'detected_objects',
+    'tracking_objects', 'object_info' and 'trajectory_history'. The track dicts
+    are copies, so they stay valid after the next frame.
+    """
+    loop = asyncio.get_running_loop()
+    if od is None:
+        od = await loop.run_in_executor(executor, ObjectDetection)
+
+    cap = await loop.run_in_executor(executor, cv2.VideoCapture, source)
+    if not cap.isOpened():
+        await loop.run_in_executor(executor, cap.release)
+        raise IOError(f"Could not open video source '{source}'")
+
+    tracker = CentroidTracker(od.classes, max_distance=max_distance,
+                              max_trajectory_points=max_trajectory_points)
+    queue = asyncio.Queue(maxsize=max(1, prefetch_frames))
+    stop = threading.Event()
+    reader = asyncio.ensure_future(_read_frames(cap, queue, stop, executor))
+
+    try:
+        frame_index = 0
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                break
+
+            (class_ids, scores, boxes) = await loop.run_in_executor(
+                executor, _detect, od, frame, nmsThreshold, confThreshold)
+            detected_objects = detections_to_objects(class_ids, scores, boxes)
+            tracker.update(detected_objects)
+
+            yield {
+                'frame_index': frame_index,
+                'frame': frame,
+                'detected_objects': detected_objects,
+                'tracking_objects': dict(tracker.tracking_objects),
+                'object_info': dict(tracker.object_info),
+                'trajectory_history': {object_id: list(trajectory)
+                                       for object_id, trajectory in tracker.trajectory_history.items()},
+            }
+            frame_index += 1
+
+        # Surface capture errors once the stream has ended
+        await reader
+    finally:
+        # Stop the reader and wait for its current cap.read() to return before
+        # releasing the capture; a thread blocked in read() cannot be cancelled
+        stop.set()
+        while not reader.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait({reader}, timeout=0.05)
+        if not reader.cancelled():
+            reader.exception()  # Mark as retrieved, errors were raised above
+        await loop.run_in_executor(executor, cap.release)
+
+
+async def _print_stream(source, od):
+    async for result in track_stream(source, od):
+        if result['frame_index'] % 30 == 0:
+            print(f"[{source}] Frame: {result['frame_index']} | "
+                  f"Tracked Objects: {len(result['tracking_objects'])}")
+
+
+async def main(sources):
+    """Track several sources concurrently with one shared ObjectDetection"""
+    loop = asyncio.get_running_loop()
+    od = await loop.run_in_executor(None, ObjectDetection)
+    await asyncio.gather(*(_print_stream(source, od) for source in sources))
+
+
+if __name__ == "__main__":
+    # Example: python async_tracking.py los_angeles.mp4 0
+    sources = [int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]] or ["los_angeles.mp4"]
+    asyncio.run(main(sources))
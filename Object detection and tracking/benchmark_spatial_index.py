@@ -0,0 +1,97 @@
+"""
+Benchmark of the grid spatial index used to match tracks to detections
+Run this script to see how association scales with the number of objects
+
+Compares the grid index (spatial_index.py) with a dense track x detection
+distance matrix on synthetic frames with 1k-10k moving objects.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from spatial_index import GridIndex, greedy_assignment
+
+FRAME_WIDTH = 3840
+FRAME_HEIGHT = 2160
+DENSE_MEMORY_LIMIT_MB = 2048  # Skip the dense matrix above this size
+
+
+def make_frame_pair(count, max_motion, rng):
+    """Track positions and the detections of the next frame (same objects, moved)"""
+    tracks = rng.uniform((0, 0), (FRAME_WIDTH, FRAME_HEIGHT), size=(count, 2))
+    motion = rng.uniform(-max_motion, max_motion, size=(count, 2))
+    detections = rng.permutation(tracks + motion)
+    return tracks, detections
+
+
+def dense_pairs(tracks, detections, gate):
+    """All candidate pairs from a full distance matrix"""
+    deltas = tracks[:, None, :] - detections[None, :, :]
+    distances = np.hypot(deltas[..., 0], deltas[..., 1])
+    rows, cols = np.nonzero(distances < gate)
+    return rows, cols, distances[rows, cols]
+
+
+def grid_pairs(tracks, detections, gate):
+    """Candidate pairs from the grid index"""
+    return GridIndex(gate).build(detections).query_pairs(tracks, gate)
+
+
+def time_call(function, repeats):
+    """Best wall time of several runs in milliseconds, plus the last result"""
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark track/detection association")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 2000, 5000, 10000])
+    parser.add_argument("--gate", type=float, default=50, help="Tracking distance gate in pixels")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    print("=" * 78)
+    print(f"Association benchmark ({FRAME_WIDTH}x{FRAME_HEIGHT} frame, gate {args.gate:.0f} px)")
+    print("=" * 78)
+    print(f"{'Objects':>8} {'Pairs':>9} {'Dense (ms)':>11} {'Dense (MB)':>11} "
+          f"{'Grid (ms)':>10} {'Assign (ms)':>12} {'Speedup':>8}")
+
+    for count in args.counts:
+        tracks, detections = make_frame_pair(count, args.gate / 2, rng)
+
+        grid_ms, (rows, cols, distances) = time_call(
+            lambda: grid_pairs(tracks, detections, args.gate), args.repeats)
+        assign_ms, _ = time_call(lambda: greedy_assignment(rows, cols, distances), args.repeats)
+
+        dense_mb = count * count * 8 * 3 / (1024 * 1024)  # deltas (x2) + distances, float64
+        if dense_mb <= DENSE_MEMORY_LIMIT_MB:
+            dense_ms, (dense_rows, dense_cols, _) = time_call(
+                lambda: dense_pairs(tracks, detections, args.gate), args.repeats)
+            # Both methods must find exactly the same candidate pairs
+            assert set(zip(dense_rows.tolist(), dense_cols.tolist())) == set(zip(rows.tolist(), cols.tolist()))
+            dense_text = f"{dense_ms:11.1f}"
+            speedup_text = f"{dense_ms / grid_ms:7.1f}x"
+        else:
+            dense_text = f"{'skipped':>11}"
+            speedup_text = f"{'-':>8}"
+
+        print(f"{count:8d} {len(rows):9d} {dense_text} {dense_mb:11.0f} "
+              f"{grid_ms:10.1f} {assign_ms:12.1f} {speedup_text}")
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
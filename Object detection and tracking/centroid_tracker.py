@@ -0,0 +1,108 @@
+# Centroid Tracker Module
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# The tracking algorithm of object_tracking.py as a class, so several streams
+# (async services, worker processes) can each keep their own tracker state.
+
+from spatial_index import match_points
+
+
+def detections_to_objects(class_ids, scores, boxes):
+    """Turn ObjectDetection.detect output into the detected object dicts used by the tracker"""
+    detected_objects = []
+    for i, box in enumerate(boxes):
+        (x, y, w, h) = box
+        cx = int((x + x + w) / 2)
+        cy = int((y + y + h) / 2)
+        detected_objects.append({
+            'center': (cx, cy),
+            'box': (x, y, w, h),
+            'class_id': class_ids[i],
+            'score': scores[i]
+        })
+    return detected_objects
+
+
+class CentroidTracker:
+    def __init__(self, classes, max_distance=50, max_trajectory_points=30, init_frames=2):
+        self.classes = classes
+        self.max_distance = max_distance
+        self.max_trajectory_points = max_trajectory_points
+        self.init_frames = init_frames
+
+        self.count = 0
+        self.track_id = 0
+        self.tracking_objects = {}     # {object_id: (cx, cy)}
+        self.object_info = {}          # {object_id: {'class_id', 'score', 'class_name'}}
+        self.trajectory_history = {}   # {object_id: [(x1, y1), (x2, y2), ...]}
+
+    def _set_info(self, object_id, obj):
+        self.object_info[object_id] = {
+            'class_id': obj['class_id'],
+            'score': obj['score'],
+            'class_name': self.classes[obj['class_id']]
+        }
+
+    def _add_object(self, obj):
+        self.tracking_objects[self.track_id] = obj['center']
+        self._set_info(self.track_id, obj)
+        # Initialize trajectory for this object
+        self.trajectory_history[self.track_id] = [obj['center']]
+        self.track_id += 1
+
+    def update(self, detected_objects):
+        """Update the tracks with the detected objects of the next frame"""
+        self.count += 1
+
+        if self.count <= self.init_frames:
+            # First frames: initialize tracking
+            for obj in detected_objects:
+                self._add_object(obj)
+            return self.tracking_objects
+
+        # Match detected objects with tracked objects
+        # Only pairs closer than max_distance are scored (grid index),
+        # then each object takes its nearest free detection
+        object_ids = list(self.tracking_objects.keys())
+        matches = match_points([self.tracking_objects[object_id] for object_id in object_ids],
+                               [obj['center'] for obj in detected_objects],
+                               self.max_distance)
+        matched_objects = set()
+        matched_detections = set()
+
+        for track_index, detection_index in matches:
+            object_id = object_ids[track_index]
+            obj = detected_objects[detection_index]
+            pt = obj['center']
+
+            # Update tracked object position
+            self.tracking_objects[object_id] = pt
+            self._set_info(object_id, obj)
+
+            # Update trajectory history
+            trajectory = self.trajectory_history.setdefault(object_id, [])
+            trajectory.append(pt)
+
+            # Keep only last N points to prevent memory overflow
+            if len(trajectory) > self.max_trajectory_points:
+                trajectory.pop(0)
+
+            matched_objects.add(object_id)
+            matched_detections.add(detection_index)
+
+        # Remove lost objects
+        for object_id in object_ids:
+            if object_id not in matched_objects:
+                self.tracking_objects.pop(object_id)
+                self.object_info.pop(object_id, None)
+                # Keep trajectory for a bit even after object is lost (optional)
+                # Or remove it immediately: self.trajectory_history.pop(object_id, None)
+
+        # Add new detected objects that weren't matched
+        for i, obj in enumerate(detected_objects):
+            if i not in matched_detections:
+                self._add_object(obj)
+
+        return self.tracking_objects
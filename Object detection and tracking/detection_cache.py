@@ -0,0 +1,137 @@
+# Detection Cache Module
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# Stores YOLOv4 detections on disk so the tracker can be re-run on the same
+# video without running inference again. Each cache entry lives in its own
+# folder named after a key built from:
+#   - the video file content (SHA-256)
+#   - the model files in use (SHA-256): the ONNX file when one is set,
+#     otherwise the darknet weights and config
+#   - the network input size and the NMS / confidence thresholds
+# Changing any of these gives a different key, so old results are never reused
+# by mistake. The detections are stored column by column as .npy files and
+# opened memory-mapped, so replaying only touches the frames that are read:
+#   offsets.npy    int64 (frames + 1,)  detection range of each frame
+#   class_ids.npy  int32 (detections,)
+#   scores.npy     float32 (detections,)
+#   boxes.npy      int32 (detections, 4)  x, y, w, h
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_DIR = "detection_cache"
+CACHE_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_object:
+        for chunk in iter(lambda: file_object.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detection_cache_key(video_path, od, nmsThreshold=None, confThreshold=None):
+    """Build the cache key for a video processed by an ObjectDetection instance"""
+    key_fields = {
+        'version': CACHE_VERSION,
+        'video': file_sha256(video_path),
+    }
+    if getattr(od, 'onnx_path', None):
+        # The darknet files are not loaded (and may not exist) with an ONNX model
+        key_fields['onnx'] = file_sha256(od.onnx_path)
+    else:
+        key_fields['weights'] = file_sha256(od.weights_path)
+        key_fields['cfg'] = file_sha256(od.cfg_path)
+    key_fields.update({
+        'input_size': od.image_size,
+        'nms_threshold': od.nmsThreshold if nmsThreshold is None else nmsThreshold,
+        'conf_threshold': od.confThreshold if confThreshold is None else confThreshold,
+    })
+    encoded = json.dumps(key_fields, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32], key_fields
+
+
+class DetectionCache:
+    def __init__(self, video_path, od, cache_dir=CACHE_DIR, nmsThreshold=None, confThreshold=None):
+        self.key, self.key_fields = detection_cache_key(video_path, od, nmsThreshold, confThreshold)
+        self.path = os.path.join(cache_dir, self.key)
+        self.is_complete = os.path.exists(os.path.join(self.path, "meta.json"))
+
+        # Columns being recorded (only used when the cache is not complete yet)
+        self._offsets = [0]
+        self._class_ids = []
+        self._scores = []
+        self._boxes = []
+
+        if self.is_complete:
+            self._load()
+
+    def _load(self):
+        self.offsets = np.load(os.path.join(self.path, "offsets.npy"), mmap_mode="r")
+        self.class_ids = np.load(os.path.join(self.path, "class_ids.npy"), mmap_mode="r")
+        self.scores = np.load(os.path.join(self.path, "scores.npy"), mmap_mode="r")
+        self.boxes = np.load(os.path.join(self.path, "boxes.npy"), mmap_mode="r")
+
+    def __len__(self):
+        if self.is_complete:
+            return len(self.offsets) - 1
+        return len(self._offsets) - 1
+
+    def get(self, frame_index):
+        """Return cached (class_ids, scores, boxes) for a frame, like ObjectDetection.detect"""
+        start, end = int(self.offsets[frame_index]), int(self.offsets[frame_index + 1])
+        return (np.asarray(self.class_ids[start:end]),
+                np.asarray(self.scores[start:end]),
+                np.asarray(self.boxes[start:end]))
+
+    def append(self, class_ids, scores, boxes):
+        """Record the detections of the next frame"""
+        class_ids = np.asarray(class_ids, dtype=np.int32).reshape(-1)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+        self._class_ids.append(class_ids)
+        self._scores.append(scores)
+        self._boxes.append(boxes)
+        self._offsets.append(self._offsets[-1] + len(boxes))
+
+    def save(self):
+        """Write recorded detections to disk and switch the cache to replay mode"""
+        # Write into a temporary folder first so an interrupted save never
+        # leaves a half-written entry that looks complete
+        tmp_path = self.path + ".tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        np.save(os.path.join(tmp_path, "offsets.npy"), np.asarray(self._offsets, dtype=np.int64))
+        np.save(os.path.join(tmp_path, "class_ids.npy"),
+                np.concatenate(self._class_ids) if self._class_ids else np.zeros(0, dtype=np.int32))
+        np.save(os.path.join(tmp_path, "scores.npy"),
+                np.concatenate(self._scores) if self._scores else np.zeros(0, dtype=np.float32))
+        np.save(os.path.join(tmp_path, "boxes.npy"),
+                np.concatenate(self._boxes) if self._boxes else np.zeros((0, 4), dtype=np.int32))
+
+        meta = dict(self.key_fields, frames=len(self._offsets) - 1)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as file_object:
+            json.dump(meta, file_object, indent=2)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+
+        self._offsets = [0]
+        self._class_ids = []
+        self._scores = []
+        self._boxes = []
+        self.is_complete = True
+        self._load()
+        return self.path
@@ -1,75 +1,335 @@
 """
 Download YOLOv4 model files for object detection
 Run this script to automatically download the required model files
+
+Features:
+  - Large files are fetched in parallel chunks with HTTP range requests
+  - Interrupted downloads resume from the partial .part file on the next run
+  - SHA-256 verification: the weights digest is pinned in the table below
+    (release assets do not change), or pass your own digests with --checksums
+  - The config and class names ship with this project. If one is missing it
+    is restored from the git checkout and checked against dnn_model/SHA256SUMS;
+    only without git is it fetched from darknet master, which may differ
+  - Mirrors: HTTP(S) base URLs or local folders, tried before the original URL
+
+Examples:
+  python download_models.py
+  python download_models.py --mirror http://fileserver.local/models/
+  python download_models.py --mirror /mnt/shared/models --workers 8
+  MODEL_MIRRORS="http://fileserver.local/models/" python download_models.py
 """
 
+import argparse
+import hashlib
+import json
 import os
-import urllib.request
+import shutil
+import subprocess
 import sys
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
-def download_file(url, destination):
-    """Download file with progress indicator"""
-    print(f"\nDownloading: {os.path.basename(destination)}")
-    print(f"From: {url}")
-    
-    def reporthook(count, block_size, total_size):
-        percent = int(count * block_size * 100 / total_size)
-        sys.stdout.write(f"\rProgress: {percent}% ")
-        sys.stdout.flush()
-    
+CHUNK_SIZE = 8 * 1024 * 1024       # Bytes per range request
+READ_SIZE = 256 * 1024             # Bytes per socket read
+DEFAULT_WORKERS = 4
+CHUNK_RETRIES = 3
+TIMEOUT = 30                       # Seconds
+
+
+def sha256_of_file(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_object:
+        for block in iter(lambda: file_object.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_checksums(path):
+    """Read a sha256sum style file: '<hex digest>  <file name>' per line"""
+    checksums = {}
+    if path and os.path.exists(path):
+        with open(path, "r") as file_object:
+            for line in file_object:
+                parts = line.strip().split()
+                if len(parts) == 2:
+                    checksums[os.path.basename(parts[1].lstrip("*"))] = parts[0].lower()
+    return checksums
+
+
+def mirror_location(mirror, url):
+    """Location of a file on a mirror, which keeps the original file names"""
+    file_name = os.path.basename(urllib.parse.urlparse(url).path)
+    if urllib.parse.urlparse(mirror).scheme in ("http", "https", "file"):
+        return mirror.rstrip("/") + "/" + file_name
+    return os.path.join(mirror, file_name)
+
+
+def probe(url):
+    """Return (total size or None, True if the server accepts range requests)"""
+    request = urllib.request.Request(url, headers={"Range": "bytes=0-0"})
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        content_range = response.headers.get("Content-Range")
+        if response.status == 206 and content_range and "/" in content_range:
+            total = content_range.rsplit("/", 1)[1]
+            return (int(total) if total.isdigit() else None), True
+        length = response.headers.get("Content-Length")
+        return (int(length) if length else None), False
+
+
+class Progress:
+    """Thread-safe progress line shared by all chunk workers"""
+
+    def __init__(self, total, done=0):
+        self.total = total
+        self.done = done
+        self.lock = threading.Lock()
+
+    def add(self, count):
+        with self.lock:
+            self.done += count
+            if self.total:
+                percent = int(self.done * 100 / self.total)
+                sys.stdout.write(f"\rProgress: {percent}% ({self.done / (1024 * 1024):.1f} MB) ")
+            else:
+                sys.stdout.write(f"\rProgress: {self.done / (1024 * 1024):.1f} MB ")
+            sys.stdout.flush()
+
+
+def download_range(url, part_path, start, end, progress):
+    """Download bytes start..end (inclusive) into the same place of the part file"""
+    request = urllib.request.Request(url, headers={"Range": f"bytes={start}-{end}"})
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        if response.status != 206:
+            raise IOError(f"server ignored range request (HTTP {response.status})")
+        with open(part_path, "r+b") as file_object:
+            file_object.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    block = response.read(min(READ_SIZE, remaining))
+                    if not block:
+                        raise IOError("connection closed before the chunk was complete")
+                    file_object.write(block)
+                    remaining -= len(block)
+                    progress.add(len(block))
+            except Exception:
+                # The chunk will be fetched again from the start
+                progress.add(-(end - start + 1 - remaining))
+                raise
+
+
+def download_parallel(url, part_path, total, workers):
+    """Download a file in parallel chunks, skipping chunks finished by an earlier run"""
+    state_path = part_path + ".json"
+    chunk_count = (total + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+    # Resume only if the partial file belongs to the same download
+    state = None
+    if os.path.exists(state_path) and os.path.exists(part_path):
+        with open(state_path, "r") as file_object:
+            state = json.load(file_object)
+        if state.get('url') != url or state.get('size') != total or state.get('chunk_size') != CHUNK_SIZE:
+            state = None
+    if state is None:
+        state = {'url': url, 'size': total, 'chunk_size': CHUNK_SIZE, 'done': []}
+        with open(part_path, "wb") as file_object:
+            file_object.truncate(total)
+
+    done = set(state['done'])
+    pending = [index for index in range(chunk_count) if index not in done]
+    if done:
+        print(f"Resuming: {len(done)}/{chunk_count} chunks already downloaded")
+
+    finished_bytes = sum(min(CHUNK_SIZE, total - index * CHUNK_SIZE) for index in done)
+    progress = Progress(total, finished_bytes)
+    state_lock = threading.Lock()
+
+    def fetch_chunk(index):
+        start = index * CHUNK_SIZE
+        end = min(start + CHUNK_SIZE, total) - 1
+        for attempt in range(CHUNK_RETRIES):
+            try:
+                download_range(url, part_path, start, end, progress)
+                break
+            except Exception:
+                if attempt == CHUNK_RETRIES - 1:
+                    raise
+        with state_lock:
+            state['done'].append(index)
+            with open(state_path, "w") as file_object:
+                json.dump(state, file_object)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() re-raises the first chunk error, if any
+        list(executor.map(fetch_chunk, pending))
+
+    os.remove(state_path)
+
+
+def download_stream(url, part_path, total):
+    """Single stream download for servers without range support (no resume)"""
+    progress = Progress(total)
+    with urllib.request.urlopen(url, timeout=TIMEOUT) as response, open(part_path, "wb") as file_object:
+        for block in iter(lambda: response.read(READ_SIZE), b""):
+            file_object.write(block)
+            progress.add(len(block))
+
+
+def fetch(source, part_path, workers):
+    """Fetch one source (URL or local path) into the part file"""
+    scheme = urllib.parse.urlparse(source).scheme
+    if scheme not in ("http", "https"):
+        # Local mirror (plain path or file:// URL)
+        local_path = urllib.request.url2pathname(urllib.parse.urlparse(source).path) if scheme == "file" else source
+        shutil.copyfile(local_path, part_path)
+        return
+
+    total, accepts_ranges = probe(source)
+    if total and accepts_ranges and total > CHUNK_SIZE:
+        download_parallel(source, part_path, total, workers)
+    else:
+        download_stream(source, part_path, total)
+
+
+def restore_committed_copy(path, sha256=None):
+    """Restore a file shipped with the project from the git checkout and verify it"""
+    if shutil.which("git") is None:
+        return False
+    git_path = "./" + path.replace(os.sep, "/")
     try:
-        urllib.request.urlretrieve(url, destination, reporthook)
+        content = subprocess.run(["git", "show", f"HEAD:{git_path}"],
+                                 capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+    digest = hashlib.sha256(content).hexdigest()
+    if sha256 and digest != sha256.lower():
+        print("\n✗ Committed copy does not match SHA256SUMS, not restoring it")
+        print(f"  Expected: {sha256}")
+        print(f"  Got:      {digest}")
+        return False
+
+    part_path = path + ".part"
+    with open(part_path, "wb") as file_object:
+        file_object.write(content)
+    os.replace(part_path, path)
+    print(f"\n✓ Restored {os.path.basename(path)} from the git checkout")
+    print(f"  SHA-256: {digest}" + (" (verified)" if sha256 else ""))
+    return True
+
+
+def download_file(url, destination, sha256=None, mirrors=(), workers=DEFAULT_WORKERS):
+    """Download a file from the mirrors or the original URL and verify it"""
+    print(f"\nDownloading: {os.path.basename(destination)}")
+    part_path = destination + ".part"
+    sources = [mirror_location(mirror, url) for mirror in mirrors] + [url]
+
+    for source in sources:
+        print(f"From: {source}")
+        try:
+            fetch(source, part_path, workers)
+        except Exception as e:
+            print(f"\n✗ Error downloading: {e}")
+            continue
+
+        digest = sha256_of_file(part_path)
+        if sha256 and digest != sha256.lower():
+            print("\n✗ SHA-256 mismatch, discarding download")
+            print(f"  Expected: {sha256}")
+            print(f"  Got:      {digest}")
+            os.remove(part_path)
+            continue
+
+        # Only a complete, verified file gets the final name
+        os.replace(part_path, destination)
         print("\n✓ Download complete!")
+        print(f"  SHA-256: {digest}" + (" (verified)" if sha256 else ""))
         return True
-    except Exception as e:
-        print(f"\n✗ Error downloading: {e}")
-        return False
+
+    return False
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Download YOLOv4 model files")
+    parser.add_argument("--mirror", action="append", default=[],
+                        help="Mirror base URL or local folder (can be repeated)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Parallel chunk downloads per file")
+    parser.add_argument("--checksums", default=None,
+                        help="sha256sum style file with expected digests (override the pinned ones)")
+    args = parser.parse_args()
+
     # Create dnn_model directory if it doesn't exist
     model_dir = "dnn_model"
     if not os.path.exists(model_dir):
         os.makedirs(model_dir)
         print(f"Created directory: {model_dir}")
-    
+
+    mirrors = args.mirror + os.environ.get("MODEL_MIRRORS", "").replace(",", " ").split()
+    checksums = load_checksums(args.checksums)
+    # Digests of the config and class names committed in dnn_model (not of upstream master)
+    committed_checksums = load_checksums(os.path.join(model_dir, "SHA256SUMS"))
+
+    # Digests from --checksums take precedence over the ones pinned here.
+    # 'bundled' files are committed to this project, the URL is only a fallback.
     files_to_download = [
         {
             'url': 'https://github.com/AlexeyAB/darknet/releases/download/darknet_yolo_v3_optimal/yolov4.weights',
             'path': os.path.join(model_dir, 'yolov4.weights'),
-            'size': '245 MB'
+            'size': '245 MB',
+            'sha256': 'e8a4f6c62188738d86dc6898d82724ec0964d0eb9d2ae0f0a9d53d65d108d562'
         },
         {
             'url': 'https://raw.githubusercontent.com/AlexeyAB/darknet/master/cfg/yolov4.cfg',
             'path': os.path.join(model_dir, 'yolov4.cfg'),
-            'size': '12 KB'
+            'size': '12 KB',
+            'sha256': None,
+            'bundled': True
         },
         {
             'url': 'https://raw.githubusercontent.com/AlexeyAB/darknet/master/data/coco.names',
             'path': os.path.join(model_dir, 'classes.txt'),
-            'size': '1 KB'
+            'size': '1 KB',
+            'sha256': None,
+            'bundled': True
         }
     ]
-    
+
     print("=" * 60)
     print("YOLOv4 Model Downloader")
     print("=" * 60)
-    
+    if mirrors:
+        print(f"Mirrors: {', '.join(mirrors)}")
+
     for file_info in files_to_download:
         file_path = file_info['path']
-        
-        # Check if file already exists
+        expected_sha256 = checksums.get(os.path.basename(file_path)) or file_info['sha256']
+
+        # Check if file already exists (partial downloads only ever exist as .part files)
         if os.path.exists(file_path):
-            print(f"\n✓ {os.path.basename(file_path)} already exists (skipping)")
-            continue
-        
+            if expected_sha256 and sha256_of_file(file_path) != expected_sha256.lower():
+                print(f"\n⚠ {os.path.basename(file_path)} exists but fails SHA-256 check, downloading again")
+            else:
+                print(f"\n✓ {os.path.basename(file_path)} already exists (skipping)")
+                continue
+
         print(f"\nFile: {os.path.basename(file_path)} ({file_info['size']})")
-        success = download_file(file_info['url'], file_path)
-        
+        if file_info.get('bundled'):
+            if restore_committed_copy(file_path, committed_checksums.get(os.path.basename(file_path))):
+                continue
+            if not expected_sha256:
+                print("⚠ Fetching the upstream master copy, which is not verified and may differ")
+        success = download_file(file_info['url'], file_path, expected_sha256, mirrors, args.workers)
+
         if not success:
             print(f"\n✗ Failed to download {os.path.basename(file_path)}")
             print("Please try downloading manually or check your internet connection")
+            print("Run the script again to resume an interrupted download")
             return False
-    
+
     print("\n" + "=" * 60)
     print("✓ All model files downloaded successfully!")
     print("=" * 60)
@@ -5,12 +5,18 @@
 
 import cv2
 import numpy as np
+import os
 from object_detection import ObjectDetection
-import math
+from centroid_tracker import CentroidTracker
+from optical_flow import BoxPropagator
+from replay_source import ReplayCapture
 
 # Initialize Object Detection
 print("Initializing Object Detection for Live Camera...")
-od = ObjectDetection()
+# Optional ONNX model variant (FP16 / INT8) built with quantize_model.py,
+# e.g. "dnn_model/yolov4_int8_static.onnx". None uses the darknet model.
+ONNX_MODEL_PATH = None
+od = ObjectDetection(onnx_path=ONNX_MODEL_PATH)
 
 # Camera settings
 CAMERA_INDEX = 0  # 0 for default webcam, 1 for external camera
@@ -18,13 +24,30 @@ CAMERA_WIDTH = 640  # Reduced resolution for better FPS (was 1280)
 CAMERA_HEIGHT = 480  # Reduced resolution for better FPS (was 720)
 CAMERA_FPS = 30  # Desired FPS
 
+# Replay settings - play a recorded video or frame dump folder (see replay_source.py)
+# in real time instead of using the camera; frames are dropped if processing is too slow.
+# HEADLESS runs without a window (e.g. on CI machines). Both can be set from the environment:
+#   REPLAY_SOURCE=recording.mp4 HEADLESS=1 python live_camera_tracking.py
+REPLAY_SOURCE = os.environ.get("REPLAY_SOURCE")  # None = use the camera
+REPLAY_FPS = None  # None = original timestamps, or a fixed FPS like 30
+HEADLESS = os.environ.get("HEADLESS") == "1"
+LATENCY_REPORT = "replay_latency.csv"  # Per-frame capture -> display latency of a replay
+
 # Detection settings for better performance
-PROCESS_EVERY_N_FRAMES = 2  # Process every 2nd frame for faster performance
+# Optical flow moves the boxes between detections (instead of freezing them),
+# so the detector can run much less often. A box that cannot be followed
+# triggers a new detection right away.
+USE_OPTICAL_FLOW = True
+PROCESS_EVERY_N_FRAMES = 8 if USE_OPTICAL_FLOW else 2  # Run detection every Nth frame
 NMS_THRESHOLD = 0.3  # Non-maximum suppression (lower = less overlapping boxes)
 CONFIDENCE_THRESHOLD = 0.4  # Detection confidence (lower = more detections, higher = more accurate)
 
-# Initialize camera
-cap = cv2.VideoCapture(CAMERA_INDEX)
+# Initialize camera (or the replay source)
+if REPLAY_SOURCE:
+    print(f"Replaying: {REPLAY_SOURCE}")
+    cap = ReplayCapture(REPLAY_SOURCE, fps=REPLAY_FPS)
+else:
+    cap = cv2.VideoCapture(CAMERA_INDEX)
 
 # Set camera properties for better quality
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
@@ -33,6 +56,9 @@ cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
 
 # Check if camera opened successfully
 if not cap.isOpened():
+    if REPLAY_SOURCE:
+        print(f"Error: Could not open replay source '{REPLAY_SOURCE}'")
+        exit()
     print(f"Error: Could not open camera {CAMERA_INDEX}")
     print("Troubleshooting:")
     print("  1. Check if camera is connected")
@@ -47,21 +73,26 @@ actual_fps = int(cap.get(cv2.CAP_PROP_FPS))
 print(f"Camera initialized: {actual_width}x{actual_height} @ {actual_fps} FPS")
 print("Press ESC to exit, P to pause, S to screenshot, C to clear trails")
 
+# Tracking settings
+MAX_TRAJECTORY_POINTS = 50  # Longer trails for live camera (adjust as needed)
+MAX_TRACKING_DISTANCE = 80  # Increased threshold for better tracking across frames (pixels between frames)
+
 # Initialize tracking variables
 count = 0
-frame_skip_counter = 0
+frame_skip_counter = PROCESS_EVERY_N_FRAMES - 1  # Detect on the first frame, not after N frames
 center_points_prev_frame = []
-tracking_objects = {}
-track_id = 0
 last_detected_objects = []  # Cache last detection results
+propagator = BoxPropagator() if USE_OPTICAL_FLOW else None
+tracker = CentroidTracker(od.classes, max_distance=MAX_TRACKING_DISTANCE,
+                          max_trajectory_points=MAX_TRAJECTORY_POINTS)
 
-# Store object information (class_id, confidence)
-object_info = {}
-
-# Store trajectory history for each object
-# Format: {object_id: [(x1, y1), (x2, y2), ...]}
-trajectory_history = {}
-MAX_TRAJECTORY_POINTS = 50  # Longer trails for live camera (adjust as needed)
+# Tracker state (updated in place every frame)
+# tracking_objects: {object_id: (cx, cy)}
+# object_info: {object_id: {'class_id', 'score', 'class_name'}}
+# trajectory_history: {object_id: [(x1, y1), (x2, y2), ...]}
+tracking_objects = tracker.tracking_objects
+object_info = tracker.object_info
+trajectory_history = tracker.trajectory_history
 
 # Performance tracking
 import time
@@ -75,7 +106,10 @@ while True:
     frame_skip_counter += 1
     
     if not ret:
-        print("Error: Failed to grab frame from camera")
+        if REPLAY_SOURCE:
+            print("End of replay")
+        else:
+            print("Error: Failed to grab frame from camera")
         break
 
     # Calculate FPS
@@ -90,7 +124,19 @@ while True:
     detected_objects = []  # Store (center, class_id, score, box)
 
     # PERFORMANCE BOOST: Only run detection every N frames
-    if frame_skip_counter >= PROCESS_EVERY_N_FRAMES:
+    run_detection = frame_skip_counter >= PROCESS_EVERY_N_FRAMES
+
+    # Move cached boxes with optical flow on skipped frames
+    if not run_detection and propagator is not None:
+        flow_boxes, flow_ok = propagator.propagate(frame)
+        if flow_ok.all():
+            for obj, (x, y, w, h) in zip(last_detected_objects, flow_boxes.tolist()):
+                obj['box'] = (x, y, w, h)
+                obj['center'] = (int((x + x + w) / 2), int((y + y + h) / 2))
+        else:
+            run_detection = True  # A box lost its keypoints, ask the detector again
+
+    if run_detection:
         frame_skip_counter = 0
         # Detect objects on frame with optimized thresholds
         (class_ids, scores, boxes) = od.detect(frame, nmsThreshold=NMS_THRESHOLD, confThreshold=CONFIDENCE_THRESHOLD)
@@ -119,11 +165,17 @@ while True:
             center_points_cur_frame.append((cx, cy))
             detected_objects.append(obj_data)
             last_detected_objects.append(obj_data)  # Cache for skipped frames
-            
+
+        # Pick keypoints inside the new boxes (before anything is drawn on the frame)
+        if propagator is not None:
+            propagator.reset(frame, [obj['box'] for obj in last_detected_objects])
+
+        for obj in detected_objects:
+            (x, y, w, h) = obj['box']
             # Draw detection box (green)
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
     else:
-        # Use cached detections for skipped frames (improves FPS)
+        # Use cached (or flow-propagated) detections for skipped frames (improves FPS)
         detected_objects = last_detected_objects
         for obj in detected_objects:
             (x, y, w, h) = obj['box']
@@ -133,74 +185,7 @@ while True:
             cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 0), 2)
 
     # Tracking algorithm
-    if count <= 2:
-        # First frames: initialize tracking
-        for i, obj in enumerate(detected_objects):
-            tracking_objects[track_id] = obj['center']
-            object_info[track_id] = {
-                'class_id': obj['class_id'],
-                'score': obj['score'],
-                'class_name': od.classes[obj['class_id']]
-            }
-            # Initialize trajectory for this object
-            trajectory_history[track_id] = [obj['center']]
-            track_id += 1
-    else:
-        # Match detected objects with tracked objects
-        tracking_objects_copy = tracking_objects.copy()
-        detected_objects_copy = detected_objects.copy()
-
-        for object_id, pt2 in tracking_objects_copy.items():
-            object_exists = False
-            
-            for obj in detected_objects_copy:
-                pt = obj['center']
-                distance = math.hypot(pt2[0] - pt[0], pt2[1] - pt[1])
-
-                # Update tracked object position if close enough
-                if distance < 80:  # Increased threshold for better tracking across frames
-                    tracking_objects[object_id] = pt
-                    object_info[object_id] = {
-                        'class_id': obj['class_id'],
-                        'score': obj['score'],
-                        'class_name': od.classes[obj['class_id']]
-                    }
-                    
-                    # Update trajectory history
-                    if object_id not in trajectory_history:
-                        trajectory_history[object_id] = []
-                    trajectory_history[object_id].append(pt)
-                    
-                    # Keep only last N points to prevent memory overflow
-                    if len(trajectory_history[object_id]) > MAX_TRAJECTORY_POINTS:
-                        trajectory_history[object_id].pop(0)
-                    
-                    object_exists = True
-                    
-                    # Remove from detected list
-                    if obj in detected_objects:
-                        detected_objects.remove(obj)
-                    break
-
-            # Remove lost objects
-            if not object_exists:
-                tracking_objects.pop(object_id)
-                if object_id in object_info:
-                    object_info.pop(object_id)
-                # Keep trajectory for a bit even after object is lost (optional)
-                # Or remove it immediately: trajectory_history.pop(object_id, None)
-
-        # Add new detected objects that weren't matched
-        for obj in detected_objects:
-            tracking_objects[track_id] = obj['center']
-            object_info[track_id] = {
-                'class_id': obj['class_id'],
-                'score': obj['score'],
-                'class_name': od.classes[obj['class_id']]
-            }
-            # Initialize trajectory for new object
-            trajectory_history[track_id] = [obj['center']]
-            track_id += 1
+    tracker.update(detected_objects)
 
     # Draw trajectory lines for each tracked object
     for object_id, trajectory in trajectory_history.items():
@@ -269,11 +254,17 @@ while True:
                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
     # Show frame
-    cv2.imshow("Live Camera Object Tracking", frame)
+    if not HEADLESS:
+        cv2.imshow("Live Camera Object Tracking", frame)
+    if REPLAY_SOURCE:
+        cap.mark_displayed()
 
     # Make a copy of the points
     center_points_prev_frame = center_points_cur_frame.copy()
 
+    if HEADLESS:
+        continue
+
     # Key controls
     key = cv2.waitKey(1) & 0xFF
     if key == 27:  # ESC key
@@ -292,7 +283,17 @@ while True:
 
 print(f"\nLive camera session complete!")
 print(f"Total frames processed: {count}")
-print(f"Total unique objects tracked: {track_id}")
+print(f"Total unique objects tracked: {tracker.track_id}")
 
 cap.release()
-cv2.destroyAllWindows()
+if REPLAY_SOURCE:
+    stats = cap.stats()
+    print(f"Replay frames: {stats['frames_published']} released, {stats['frames_read']} processed, "
+          f"{stats['frames_dropped']} dropped")
+    if 'latency_mean_ms' in stats:
+        print(f"Capture -> display latency: mean {stats['latency_mean_ms']:.1f} ms | "
+              f"p95 {stats['latency_p95_ms']:.1f} ms | max {stats['latency_max_ms']:.1f} ms")
+    cap.save_latency_csv(LATENCY_REPORT)
+    print(f"Latency report saved: {LATENCY_REPORT}")
+if not HEADLESS:
+    cv2.destroyAllWindows()
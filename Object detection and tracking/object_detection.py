@@ -7,34 +7,70 @@ import cv2
 import numpy as np
 
 
+def onnx_blob_from_frame(frame, image_size):
+    """Turn a BGR frame into the (1, 3, H, W) RGB float input of an ONNX YOLOv4 model"""
+    return cv2.dnn.blobFromImage(frame, scalefactor=1/255, size=(image_size, image_size),
+                                 swapRB=True, crop=False)
+
+
 class ObjectDetection:
-    def __init__(self, weights_path="dnn_model/yolov4.weights", cfg_path="dnn_model/yolov4.cfg"):
+    def __init__(self, weights_path="dnn_model/yolov4.weights", cfg_path="dnn_model/yolov4.cfg",
+                 onnx_path=None):
         print("Loading Object Detection")
-        print("Running opencv dnn with YOLOv4")
+        self.weights_path = weights_path
+        self.cfg_path = cfg_path
+        self.onnx_path = onnx_path
         self.nmsThreshold = 0.4
         self.confThreshold = 0.5
         self.image_size = 608
+        self.model = None
+        self.session = None
 
-        # Load Network
-        net = cv2.dnn.readNet(weights_path, cfg_path)
+        if onnx_path is not None:
+            # ONNX variant (FP32, FP16 or INT8) made with quantize_model.py
+            self.load_onnx_model(onnx_path)
+        else:
+            print("Running opencv dnn with YOLOv4")
 
-        # Try to enable GPU CUDA, fallback to CPU if not available
-        try:
-            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
-            print("Using CUDA backend")
-        except:
-            print("CUDA not available, using CPU backend")
-            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-        
-        self.model = cv2.dnn_DetectionModel(net)
+            # Load Network
+            net = cv2.dnn.readNet(weights_path, cfg_path)
+
+            # Try to enable GPU CUDA, fallback to CPU if not available
+            try:
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+                print("Using CUDA backend")
+            except:
+                print("CUDA not available, using CPU backend")
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+            self.model = cv2.dnn_DetectionModel(net)
 
         self.classes = []
         self.load_class_names()
         self.colors = np.random.uniform(0, 255, size=(80, 3))
 
-        self.model.setInputParams(size=(self.image_size, self.image_size), scale=1/255)
+        if self.model is not None:
+            self.model.setInputParams(size=(self.image_size, self.image_size), scale=1/255)
+
+    def load_onnx_model(self, onnx_path):
+        # The ONNX model is expected in the layout produced by the pytorch-YOLOv4
+        # darknet2onnx exporter: input (1, 3, H, W) and outputs
+        # boxes (1, N, 1, 4) as normalized x1, y1, x2, y2 and confs (1, N, classes)
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("onnxruntime is required for ONNX models. Install with: pip install onnxruntime")
+
+        print(f"Running onnxruntime (CPU) with {onnx_path}")
+        self.session = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Use the input size baked into the model when it is static
+        if isinstance(model_input.shape[2], int):
+            self.image_size = model_input.shape[2]
 
     def load_class_names(self, classes_path="dnn_model/classes.txt"):
 
@@ -46,5 +82,46 @@ class ObjectDetection:
         self.colors = np.random.uniform(0, 255, size=(80, 3))
         return self.classes
 
-    def detect(self, frame):
-        return self.model.detect(frame, nmsThreshold=self.nmsThreshold, confThreshold=self.confThreshold)
\ No newline at end of file
+    def detect(self, frame, nmsThreshold=None, confThreshold=None):
+        # Fall back to the instance thresholds when no override is given
+        if nmsThreshold is None:
+            nmsThreshold = self.nmsThreshold
+        if confThreshold is None:
+            confThreshold = self.confThreshold
+        if self.session is not None:
+            return self.detect_onnx(frame, nmsThreshold, confThreshold)
+        return self.model.detect(frame, nmsThreshold=nmsThreshold, confThreshold=confThreshold)
+
+    def detect_onnx(self, frame, nmsThreshold, confThreshold):
+        """Run the ONNX model and return (class_ids, scores, boxes) like DetectionModel.detect"""
+        frame_height, frame_width = frame.shape[:2]
+        blob = onnx_blob_from_frame(frame, self.image_size)
+        raw_boxes, raw_confs = self.session.run(None, {self.input_name: blob})[:2]
+
+        raw_boxes = raw_boxes.reshape(-1, 4)
+        raw_confs = raw_confs.reshape(raw_boxes.shape[0], -1)
+        class_ids = raw_confs.argmax(axis=1)
+        scores = raw_confs[np.arange(len(class_ids)), class_ids]
+
+        keep = scores > confThreshold
+        raw_boxes, class_ids, scores = raw_boxes[keep], class_ids[keep], scores[keep]
+
+        # Normalized corners -> pixel x, y, w, h
+        x1 = raw_boxes[:, 0] * frame_width
+        y1 = raw_boxes[:, 1] * frame_height
+        x2 = raw_boxes[:, 2] * frame_width
+        y2 = raw_boxes[:, 3] * frame_height
+        boxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).astype(np.int32)
+
+        # Per-class NMS, same as cv2.dnn_DetectionModel
+        kept_indices = []
+        for class_id in np.unique(class_ids):
+            class_indices = np.flatnonzero(class_ids == class_id)
+            nms_indices = cv2.dnn.NMSBoxes(boxes[class_indices].tolist(), scores[class_indices].tolist(),
+                                           confThreshold, nmsThreshold)
+            kept_indices.extend(class_indices[np.asarray(nms_indices, dtype=np.int64).reshape(-1)])
+
+        kept_indices = np.asarray(sorted(kept_indices), dtype=np.int64)
+        return (class_ids[kept_indices].astype(np.int32),
+                scores[kept_indices].astype(np.float32),
+                boxes[kept_indices])
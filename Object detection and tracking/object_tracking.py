@@ -6,10 +6,18 @@
 import cv2
 import numpy as np
 from object_detection import ObjectDetection
-import math
+from centroid_tracker import CentroidTracker, detections_to_objects
+from detection_cache import DetectionCache
+from analytics import ZoneAnalytics, load_rules
+import json
+import os
+import time
 
 # Initialize Object Detection
-od = ObjectDetection()
+# Optional ONNX model variant (FP16 / INT8) built with quantize_model.py,
+# e.g. "dnn_model/yolov4_int8_static.onnx". None uses the darknet model.
+ONNX_MODEL_PATH = None
+od = ObjectDetection(onnx_path=ONNX_MODEL_PATH)
 
 # Video source - you can change this to:
 # 0 for webcam, or path to video file
@@ -17,6 +25,12 @@ VIDEO_SOURCE = "los_angeles.mp4"
 # Change to 0 for webcam
 cap = cv2.VideoCapture(VIDEO_SOURCE)
 
+# Detection cache - stores detections of a video file the first time it is fully
+# processed, then replays them on later runs instead of running YOLOv4 again.
+# Handy when tuning tracker settings (distance threshold, MAX_TRAJECTORY_POINTS).
+# The cache is invalidated automatically if the video, model or thresholds change.
+USE_DETECTION_CACHE = True
+
 # Check if video opened successfully
 if not cap.isOpened():
     print(f"Error: Could not open video source '{VIDEO_SOURCE}'")
@@ -30,122 +44,89 @@ frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 fps = int(cap.get(cv2.CAP_PROP_FPS))
 print(f"Video Info: {frame_width}x{frame_height} @ {fps} FPS")
 
+detection_cache = None
+if USE_DETECTION_CACHE and isinstance(VIDEO_SOURCE, str) and os.path.isfile(VIDEO_SOURCE):
+    print("Checking detection cache...")
+    detection_cache = DetectionCache(VIDEO_SOURCE, od)
+    if detection_cache.is_complete:
+        print(f"Replaying {len(detection_cache)} cached frames (no inference needed)")
+    else:
+        print("No cached detections yet - they will be saved after this run")
+
+# Tracking settings
+MAX_TRAJECTORY_POINTS = 30  # Maximum points to keep in trajectory (adjust for longer/shorter trails)
+MAX_TRACKING_DISTANCE = 50  # Increased threshold for better tracking (pixels between frames)
+
+# Zone / line analytics - set to a rules file (see analytics_rules.json) to count
+# line crossings and zone dwell time per class; reports go to ANALYTICS_OUTPUT.
+# Each run appends a 'start' record (video, rules, start time), its periodic
+# 'report' records and a final 'end' record, all tagged with the same run_id,
+# so the cumulative counts of different runs are never mixed up.
+ANALYTICS_RULES = None  # e.g. "analytics_rules.json"
+ANALYTICS_OUTPUT = "analytics_report.jsonl"
+analytics = None
+if ANALYTICS_RULES is not None:
+    analytics = ZoneAnalytics(load_rules(ANALYTICS_RULES), od.classes, (frame_width, frame_height))
+    analytics_run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    with open(ANALYTICS_OUTPUT, "a") as file_object:
+        file_object.write(json.dumps({'run_id': analytics_run_id, 'event': 'start',
+                                      'video': str(VIDEO_SOURCE), 'rules': os.path.abspath(ANALYTICS_RULES),
+                                      'started': time.strftime("%Y-%m-%dT%H:%M:%S")}) + "\n")
+    print(f"Analytics rules loaded: {ANALYTICS_RULES} (run {analytics_run_id})")
+
 # Initialize tracking variables
 count = 0
 center_points_prev_frame = []
-tracking_objects = {}
-track_id = 0
-
-# Store object information (class_id, confidence)
-object_info = {}
+tracker = CentroidTracker(od.classes, max_distance=MAX_TRACKING_DISTANCE,
+                          max_trajectory_points=MAX_TRAJECTORY_POINTS)
 
-# Store trajectory history for each object
-# Format: {object_id: [(x1, y1), (x2, y2), ...]}
-trajectory_history = {}
-MAX_TRAJECTORY_POINTS = 30  # Maximum points to keep in trajectory (adjust for longer/shorter trails)
+# Tracker state (updated in place every frame)
+# tracking_objects: {object_id: (cx, cy)}
+# object_info: {object_id: {'class_id', 'score', 'class_name'}}
+# trajectory_history: {object_id: [(x1, y1), (x2, y2), ...]}
+tracking_objects = tracker.tracking_objects
+object_info = tracker.object_info
+trajectory_history = tracker.trajectory_history
 
 while True:
     ret, frame = cap.read()
     count += 1
     if not ret:
         print("End of video or cannot read frame")
+        # Only a fully processed video is cached, partial runs are discarded
+        if detection_cache is not None and not detection_cache.is_complete:
+            cache_path = detection_cache.save()
+            print(f"Detections cached in: {cache_path}")
         break
 
+    # Detect objects on frame (or replay them from the cache)
+    if detection_cache is not None and detection_cache.is_complete and count <= len(detection_cache):
+        (class_ids, scores, boxes) = detection_cache.get(count - 1)
+    else:
+        (class_ids, scores, boxes) = od.detect(frame)
+        if detection_cache is not None and not detection_cache.is_complete:
+            detection_cache.append(class_ids, scores, boxes)
+
     # Point current frame
-    center_points_cur_frame = []
-    detected_objects = []  # Store (center, class_id, score, box)
+    detected_objects = detections_to_objects(class_ids, scores, boxes)
+    center_points_cur_frame = [obj['center'] for obj in detected_objects]
 
-    # Detect objects on frame
-    (class_ids, scores, boxes) = od.detect(frame)
-    
-    for i, box in enumerate(boxes):
-        (x, y, w, h) = box
-        cx = int((x + x + w) / 2)
-        cy = int((y + y + h) / 2)
-        
-        class_id = class_ids[i]
-        score = scores[i]
-        
-        center_points_cur_frame.append((cx, cy))
-        detected_objects.append({
-            'center': (cx, cy),
-            'box': (x, y, w, h),
-            'class_id': class_id,
-            'score': score
-        })
-        
+    for obj in detected_objects:
+        (x, y, w, h) = obj['box']
         # Draw detection box (green)
         cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
     # Tracking algorithm
-    if count <= 2:
-        # First frames: initialize tracking
-        for i, obj in enumerate(detected_objects):
-            tracking_objects[track_id] = obj['center']
-            object_info[track_id] = {
-                'class_id': obj['class_id'],
-                'score': obj['score'],
-                'class_name': od.classes[obj['class_id']]
-            }
-            # Initialize trajectory for this object
-            trajectory_history[track_id] = [obj['center']]
-            track_id += 1
-    else:
-        # Match detected objects with tracked objects
-        tracking_objects_copy = tracking_objects.copy()
-        detected_objects_copy = detected_objects.copy()
+    tracker.update(detected_objects)
 
-        for object_id, pt2 in tracking_objects_copy.items():
-            object_exists = False
-            
-            for obj in detected_objects_copy:
-                pt = obj['center']
-                distance = math.hypot(pt2[0] - pt[0], pt2[1] - pt[1])
-
-                # Update tracked object position if close enough
-                if distance < 50:  # Increased threshold for better tracking
-                    tracking_objects[object_id] = pt
-                    object_info[object_id] = {
-                        'class_id': obj['class_id'],
-                        'score': obj['score'],
-                        'class_name': od.classes[obj['class_id']]
-                    }
-                    
-                    # Update trajectory history
-                    if object_id not in trajectory_history:
-                        trajectory_history[object_id] = []
-                    trajectory_history[object_id].append(pt)
-                    
-                    # Keep only last N points to prevent memory overflow
-                    if len(trajectory_history[object_id]) > MAX_TRAJECTORY_POINTS:
-                        trajectory_history[object_id].pop(0)
-                    
-                    object_exists = True
-                    
-                    # Remove from detected list
-                    if obj in detected_objects:
-                        detected_objects.remove(obj)
-                    break
-
-            # Remove lost objects
-            if not object_exists:
-                tracking_objects.pop(object_id)
-                if object_id in object_info:
-                    object_info.pop(object_id)
-                # Keep trajectory for a bit even after object is lost (optional)
-                # Or remove it immediately: trajectory_history.pop(object_id, None)
-
-        # Add new detected objects that weren't matched
-        for obj in detected_objects:
-            tracking_objects[track_id] = obj['center']
-            object_info[track_id] = {
-                'class_id': obj['class_id'],
-                'score': obj['score'],
-                'class_name': od.classes[obj['class_id']]
-            }
-            # Initialize trajectory for new object
-            trajectory_history[track_id] = [obj['center']]
-            track_id += 1
+    # Analytics on current vs previous positions (timestamp in video seconds)
+    if analytics is not None:
+        report = analytics.update(tracking_objects, object_info, count / (fps or 30))
+        if report is not None:
+            with open(ANALYTICS_OUTPUT, "a") as file_object:
+                file_object.write(json.dumps({'run_id': analytics_run_id, 'event': 'report', **report}) + "\n")
+            print(f"Analytics @ {report['time']}s: {report['lines']} {report['zones']}")
+        analytics.draw(frame)
 
     # Draw trajectory lines for each tracked object
     for object_id, trajectory in trajectory_history.items():
@@ -223,7 +204,12 @@ while True:
 
 print(f"\nProcessing complete!")
 print(f"Total frames processed: {count}")
-print(f"Total unique objects tracked: {track_id}")
+print(f"Total unique objects tracked: {tracker.track_id}")
+if analytics is not None:
+    report = analytics.report(count / (fps or 30))
+    with open(ANALYTICS_OUTPUT, "a") as file_object:
+        file_object.write(json.dumps({'run_id': analytics_run_id, 'event': 'end', **report}) + "\n")
+    print(f"Analytics report saved: {ANALYTICS_OUTPUT}")
 
 cap.release()
 cv2.destroyAllWindows()
@@ -0,0 +1,108 @@
+# Optical Flow Box Propagation Module
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# Moves detection boxes between detector runs instead of freezing them.
+# After each detection a few good-features-to-track keypoints are picked
+# inside every box. On the following frames all keypoints of all boxes are
+# tracked together with one pyramidal Lucas-Kanade call on a downscaled
+# grayscale frame, and each box is shifted by the median motion of its
+# keypoints. A box that loses its keypoints is flagged as failed so the
+# caller can run the detector again. Boxes with too few keypoints to begin
+# with (flat or tiny boxes) are not propagated: they stay where they were
+# detected and are never flagged, so they do not force a detection every frame.
+
+import cv2
+import numpy as np
+
+
+class BoxPropagator:
+    def __init__(self, scale=0.5, max_corners=10, min_points=3, quality_level=0.01,
+                 min_distance=3, win_size=(15, 15), max_level=2, max_error=20.0):
+        self.scale = scale                  # Downscale factor for the flow frame
+        self.max_corners = max_corners      # Keypoints per box
+        self.min_points = min_points        # Fewer surviving keypoints = failed box
+        self.quality_level = quality_level
+        self.min_distance = min_distance
+        self.max_error = max_error
+        self.lk_params = dict(winSize=win_size, maxLevel=max_level,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+        self.prev_gray = None
+        self.boxes = np.zeros((0, 4), dtype=np.float64)      # Full resolution x, y, w, h
+        self.points = np.zeros((0, 1, 2), dtype=np.float32)  # Keypoints in the downscaled frame
+        self.point_boxes = np.zeros(0, dtype=np.int64)       # Box index of each keypoint
+        self.trackable = np.zeros(0, dtype=bool)             # Boxes still moved by their keypoints
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self, frame, boxes):
+        """Start propagating a new set of detected boxes (x, y, w, h) from this frame"""
+        gray = self._gray(frame)
+        height, width = gray.shape
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+        points = []
+        point_boxes = []
+        for box_index, (x, y, w, h) in enumerate(self.boxes * self.scale):
+            x1, y1 = max(0, int(x)), max(0, int(y))
+            x2, y2 = min(width, int(x + w)), min(height, int(y + h))
+            if x2 - x1 < 3 or y2 - y1 < 3:
+                continue
+            corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=self.max_corners,
+                                              qualityLevel=self.quality_level, minDistance=self.min_distance)
+            if corners is None or len(corners) < self.min_points:
+                continue
+            points.append(corners.reshape(-1, 2) + (x1, y1))
+            point_boxes.append(np.full(len(corners), box_index, dtype=np.int64))
+
+        if points:
+            self.points = np.concatenate(points).astype(np.float32).reshape(-1, 1, 2)
+            self.point_boxes = np.concatenate(point_boxes)
+        else:
+            self.points = np.zeros((0, 1, 2), dtype=np.float32)
+            self.point_boxes = np.zeros(0, dtype=np.int64)
+        self.trackable = np.bincount(self.point_boxes, minlength=len(self.boxes)) > 0
+        self.prev_gray = gray
+
+    def propagate(self, frame):
+        """Move all boxes to this frame; returns (boxes as int x, y, w, h, ok flag per box)
+
+        ok is False only for boxes that lost their keypoints in this frame. Such
+        a box then stays where it is, like the boxes that had too few keypoints
+        from the start (those are always ok).
+        """
+        gray = self._gray(frame)
+        moved = np.zeros(len(self.boxes), dtype=bool)
+
+        if len(self.points) > 0 and self.prev_gray is not None:
+            # One Lucas-Kanade call for the keypoints of every box
+            new_points, status, error = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points,
+                                                                 None, **self.lk_params)
+            good = (status.reshape(-1) == 1) & (error.reshape(-1) < self.max_error)
+            motion = (new_points - self.points).reshape(-1, 2)[good] / self.scale
+            good_boxes = self.point_boxes[good]
+
+            # Median keypoint motion per box
+            counts = np.bincount(good_boxes, minlength=len(self.boxes))
+            order = np.argsort(good_boxes, kind="stable")
+            split_points = np.cumsum(counts)[:-1]
+            for box_index, box_motion in enumerate(np.split(motion[order], split_points)):
+                if counts[box_index] >= self.min_points:
+                    self.boxes[box_index, :2] += np.median(box_motion, axis=0)
+                    moved[box_index] = True
+
+            # Keep tracking the surviving keypoints of the boxes that moved
+            keep = good & moved[self.point_boxes]
+            self.points = new_points[keep]
+            self.point_boxes = self.point_boxes[keep]
+
+        ok = ~(self.trackable & ~moved)
+        self.trackable &= moved
+        self.prev_gray = gray
+        return np.round(self.boxes).astype(np.int32), ok
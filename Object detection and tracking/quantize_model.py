@@ -0,0 +1,375 @@
+"""
+Build FP16 / INT8 variants of the YOLOv4 model and compare them with FP32
+Run this script to pick a faster CPU model with numbers behind the choice
+
+Steps:
+  1. Export the darknet model to ONNX (FP32). OpenCV cannot write ONNX, so use
+     the darknet2onnx exporter from https://github.com/Tianxiaomo/pytorch-YOLOv4
+     and save it as dnn_model/yolov4.onnx (or pass --onnx)
+  2. python quantize_model.py --frames sample_frames/
+     - INT8 dynamic: weights quantized, activations quantized at run time
+     - INT8 static:  weights and activations quantized, calibrated on a share
+                     of the frames (--calib-fraction)
+     - FP16:         needs the onnxconverter-common package (skipped otherwise)
+  3. Read quantization_report.md and set ONNX_MODEL_PATH in object_tracking.py
+
+The report compares every variant on the same held-out frames (never used
+for calibration): latency and memory footprint against the FP32 darknet model
+running in OpenCV, and detection agreement (mAP@0.5) against the FP32 ONNX
+model, which gets exactly the same preprocessing as the other ONNX variants.
+The darknet row is there for latency only, its input is prepared differently
+by OpenCV. Each variant is measured in a fresh process, so memory freed by an
+earlier variant cannot hide the footprint of the next one.
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from object_detection import ObjectDetection, onnx_blob_from_frame
+
+MODEL_DIR = "dnn_model"
+IMAGE_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+CALIB_FRACTION = 0.3     # Share of the sample frames used for INT8 calibration
+
+
+def load_frames(frames_dir, max_frames):
+    """Load sample frames from a folder of images or a video file"""
+    frames = []
+    if os.path.isdir(frames_dir):
+        paths = []
+        for pattern in IMAGE_EXTENSIONS:
+            paths.extend(glob.glob(os.path.join(frames_dir, pattern)))
+        for path in sorted(paths)[:max_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(frames_dir)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Spread the samples over the whole video
+        step = max(1, frame_count // max_frames) if frame_count > 0 else 1
+        index = 0
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % step == 0:
+                frames.append(frame)
+            index += 1
+        cap.release()
+    return frames
+
+
+def split_frames(frame_count, calib_fraction):
+    """Indices of the calibration frames and of the held-out evaluation frames
+
+    Calibration frames are spread evenly over the samples, the rest are kept
+    for evaluation so no variant is scored on the frames it was calibrated on.
+    """
+    calib_count = min(frame_count - 1, max(1, int(round(frame_count * calib_fraction))))
+    calib_indices = sorted(set(np.linspace(0, frame_count - 1, calib_count).round().astype(int).tolist()))
+    eval_indices = sorted(set(range(frame_count)) - set(calib_indices))
+    return calib_indices, eval_indices
+
+
+class FrameCalibrationReader:
+    """Feeds sample frames to onnxruntime static quantization"""
+
+    def __init__(self, frames, input_name, image_size):
+        # Blobs are built one at a time, all of them at once would take ~4.4 MB per frame
+        self.blobs = ({input_name: onnx_blob_from_frame(frame, image_size)} for frame in frames)
+
+    def get_next(self):
+        return next(self.blobs, None)
+
+    def rewind(self):
+        pass
+
+
+def build_variants(onnx_path, frames, output_dir):
+    """Create the quantized variants next to the FP32 ONNX model"""
+    import onnxruntime
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    base_name = os.path.splitext(os.path.basename(onnx_path))[0]
+    variants = {'onnx-fp32': onnx_path}
+
+    session = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    model_input = session.get_inputs()[0]
+    image_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else 608
+    del session
+
+    print("\nBuilding INT8 dynamic variant...")
+    dynamic_path = os.path.join(output_dir, f"{base_name}_int8_dynamic.onnx")
+    quantize_dynamic(onnx_path, dynamic_path, weight_type=QuantType.QUInt8)
+    variants['onnx-int8-dynamic'] = dynamic_path
+    print(f"✓ Saved: {dynamic_path}")
+
+    print(f"\nBuilding INT8 static variant (calibrating on {len(frames)} frames)...")
+    static_path = os.path.join(output_dir, f"{base_name}_int8_static.onnx")
+    reader = FrameCalibrationReader(frames, model_input.name, image_size)
+    quantize_static(onnx_path, static_path, reader, quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    variants['onnx-int8-static'] = static_path
+    print(f"✓ Saved: {static_path}")
+
+    try:
+        import onnx
+        from onnxconverter_common import float16
+    except ImportError:
+        print("\n⚠ onnxconverter-common not installed, skipping FP16 variant")
+        print("  Install with: pip install onnx onnxconverter-common")
+    else:
+        print("\nBuilding FP16 variant...")
+        fp16_path = os.path.join(output_dir, f"{base_name}_fp16.onnx")
+        model = float16.convert_float_to_float16(onnx.load(onnx_path), keep_io_types=True)
+        onnx.save(model, fp16_path)
+        variants['onnx-fp16'] = fp16_path
+        print(f"✓ Saved: {fp16_path}")
+
+    return variants
+
+
+def process_peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: no resource module, psutil reports the peak working set
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process(os.getpid()).memory_info().peak_wset / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def box_iou(box, boxes):
+    """IoU between one x, y, w, h box and an array of x, y, w, h boxes"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[0] + box[2], boxes[:, 0] + boxes[:, 2])
+    y2 = np.minimum(box[1] + box[3], boxes[:, 1] + boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box[2] * box[3] + boxes[:, 2] * boxes[:, 3] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def detection_agreement_map(reference, candidate, iou_threshold=0.5):
+    """mAP of candidate detections using reference detections as ground truth
+
+    Both arguments are lists with one (class_ids, scores, boxes) tuple per frame.
+    """
+    ground_truth = {}    # class_id -> number of reference boxes
+    predictions = {}     # class_id -> [(score, is_true_positive)]
+
+    for (ref_ids, _, ref_boxes), (cand_ids, cand_scores, cand_boxes) in zip(reference, candidate):
+        ref_ids = np.asarray(ref_ids).reshape(-1)
+        ref_boxes = np.asarray(ref_boxes, dtype=np.float64).reshape(-1, 4)
+        cand_ids = np.asarray(cand_ids).reshape(-1)
+        cand_scores = np.asarray(cand_scores).reshape(-1)
+        cand_boxes = np.asarray(cand_boxes, dtype=np.float64).reshape(-1, 4)
+
+        for class_id in np.unique(np.concatenate([ref_ids, cand_ids])):
+            class_ref = ref_boxes[ref_ids == class_id]
+            ground_truth[class_id] = ground_truth.get(class_id, 0) + len(class_ref)
+            matched = np.zeros(len(class_ref), dtype=bool)
+
+            class_mask = cand_ids == class_id
+            order = np.argsort(-cand_scores[class_mask])
+            for box, score in zip(cand_boxes[class_mask][order], cand_scores[class_mask][order]):
+                is_match = False
+                if len(class_ref) > 0:
+                    ious = box_iou(box, class_ref)
+                    ious[matched] = 0
+                    best = int(ious.argmax())
+                    if ious[best] >= iou_threshold:
+                        matched[best] = True
+                        is_match = True
+                predictions.setdefault(class_id, []).append((float(score), is_match))
+
+    average_precisions = []
+    for class_id, total in ground_truth.items():
+        if total == 0:
+            continue
+        class_predictions = sorted(predictions.get(class_id, []), key=lambda p: -p[0])
+        hits = np.array([is_match for _, is_match in class_predictions], dtype=np.float64)
+        if len(hits) == 0:
+            average_precisions.append(0.0)
+            continue
+        true_positives = np.cumsum(hits)
+        recall = true_positives / total
+        precision = true_positives / np.arange(1, len(hits) + 1)
+
+        # All-point interpolated AP (precision envelope over recall steps)
+        recall = np.concatenate([[0.0], recall, [1.0]])
+        precision = np.concatenate([[1.0], precision, [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        steps = np.flatnonzero(recall[1:] != recall[:-1])
+        average_precisions.append(float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1])))
+
+    if not average_precisions:
+        return 1.0
+    return float(np.mean(average_precisions))
+
+
+def evaluate(name, detector_kwargs, model_paths, frames_source, max_frames, frame_indices, warmup):
+    """Measure latency, memory and detections of one model variant
+
+    Meant to run in a fresh process (see evaluate_in_subprocess): the frames
+    are loaded again here and memory is the peak resident memory added by
+    loading and running the model.
+    """
+    frames = load_frames(frames_source, max_frames)
+    frames = [frames[i] for i in frame_indices]
+    peak_before = process_peak_rss_mb()
+    od = ObjectDetection(**detector_kwargs)
+
+    for frame in frames[:warmup]:
+        od.detect(frame)
+
+    detections = []
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(od.detect(frame))
+        latencies.append((time.perf_counter() - start) * 1000)
+    peak_after = process_peak_rss_mb()
+
+    latencies = np.array(latencies)
+    result = {
+        'variant': name,
+        'model_mb': sum(os.path.getsize(path) for path in model_paths) / (1024 * 1024),
+        'memory_mb': None if peak_before is None else peak_after - peak_before,
+        'latency_mean_ms': float(latencies.mean()),
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+    }
+    return result, detections
+
+
+def evaluate_in_subprocess(name, *args):
+    """Run evaluate() in a new spawned process so every variant starts from a clean heap"""
+    print(f"\nEvaluating: {name}")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        result, detections = executor.submit(evaluate, name, *args).result()
+    print(f"✓ Mean latency: {result['latency_mean_ms']:.1f} ms")
+    return result, detections
+
+
+def write_report(results, report_path):
+    """Write the comparison table as markdown and JSON"""
+    reference_latency = results[0]['latency_mean_ms']
+    lines = [
+        "# Model Variant Report",
+        "",
+        "| Variant | Model (MB) | Memory (MB) | Mean (ms) | p50 (ms) | p95 (ms) | Speedup | mAP@0.5 vs ONNX FP32 |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for result in results:
+        memory = "n/a" if result['memory_mb'] is None else f"{result['memory_mb']:.0f}"
+        agreement = "n/a" if result['map_vs_fp32'] is None else f"{result['map_vs_fp32']:.3f}"
+        lines.append(
+            f"| {result['variant']} | {result['model_mb']:.1f} | {memory} | "
+            f"{result['latency_mean_ms']:.1f} | {result['latency_p50_ms']:.1f} | {result['latency_p95_ms']:.1f} | "
+            f"{reference_latency / result['latency_mean_ms']:.2f}x | {agreement} |"
+        )
+    lines.append("")
+    lines.append("Memory is the peak resident memory added by loading and running the model,")
+    lines.append("each variant measured in its own process (needs psutil on Windows).")
+    lines.append("Speedup is relative to the darknet model in OpenCV, which is not scored for")
+    lines.append("agreement because its input preprocessing differs from the ONNX variants.")
+
+    with open(report_path, "w") as file_object:
+        file_object.write("\n".join(lines) + "\n")
+    with open(os.path.splitext(report_path)[0] + ".json", "w") as file_object:
+        json.dump(results, file_object, indent=2)
+
+    print("\n" + "\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize YOLOv4 and compare variants")
+    parser.add_argument("--frames", required=True,
+                        help="Folder of sample images or a video file used for calibration and evaluation")
+    parser.add_argument("--onnx", default=os.path.join(MODEL_DIR, "yolov4.onnx"),
+                        help="FP32 ONNX export of the darknet model")
+    parser.add_argument("--weights", default=os.path.join(MODEL_DIR, "yolov4.weights"))
+    parser.add_argument("--cfg", default=os.path.join(MODEL_DIR, "yolov4.cfg"))
+    parser.add_argument("--max-frames", type=int, default=100)
+    parser.add_argument("--calib-fraction", type=float, default=CALIB_FRACTION,
+                        help="Share of the frames used for INT8 calibration, the rest is used for evaluation")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--report", default="quantization_report.md")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("YOLOv4 Model Quantization")
+    print("=" * 60)
+
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("✗ onnxruntime not found. Install with: pip install onnxruntime")
+        return False
+
+    if not os.path.exists(args.onnx):
+        print(f"✗ ONNX model not found: {args.onnx}")
+        print("  Export the darknet model first with the darknet2onnx tool from")
+        print("  https://github.com/Tianxiaomo/pytorch-YOLOv4 and save it there")
+        return False
+
+    frames = load_frames(args.frames, args.max_frames)
+    if len(frames) < 2:
+        print(f"✗ At least 2 frames are needed (calibration + evaluation), got {len(frames)} from: {args.frames}")
+        return False
+    calib_indices, eval_indices = split_frames(len(frames), args.calib_fraction)
+    print(f"✓ Loaded {len(frames)} sample frames: {len(calib_indices)} for calibration, "
+          f"{len(eval_indices)} held out for evaluation")
+
+    calib_frames = [frames[i] for i in calib_indices]
+    del frames  # Each evaluation process loads its own copy
+    variants = build_variants(args.onnx, calib_frames, os.path.dirname(args.onnx) or ".")
+    del calib_frames
+    frame_args = (args.frames, args.max_frames, eval_indices, args.warmup)
+
+    # FP32 darknet model in OpenCV is the latency baseline only
+    darknet_result, _ = evaluate_in_subprocess(
+        'darknet-fp32 (opencv)', {'weights_path': args.weights, 'cfg_path': args.cfg},
+        [args.weights, args.cfg], *frame_args)
+    darknet_result['map_vs_fp32'] = None
+    results = [darknet_result]
+
+    # FP32 ONNX model (evaluated first) is the reference for agreement
+    reference_detections = None
+    for name, path in variants.items():
+        result, detections = evaluate_in_subprocess(
+            name, {'weights_path': args.weights, 'cfg_path': args.cfg, 'onnx_path': path},
+            [path], *frame_args)
+        if reference_detections is None:
+            reference_detections = detections
+        result['path'] = path
+        result['map_vs_fp32'] = detection_agreement_map(reference_detections, detections)
+        results.append(result)
+
+    write_report(results, args.report)
+    print(f"\n✓ Report saved: {args.report}")
+    print("Set ONNX_MODEL_PATH in object_tracking.py to use a variant")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,243 @@
+# Replay Frame Source Module
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# Plays a video file or a recorded frame dump as if it came from a live
+# camera, so live_camera_tracking.py can be tested without a camera.
+#   - Frames are released at their original timestamps (or at a fixed FPS)
+#     by a background thread, whether or not anyone is reading them.
+#   - Like a camera, only the newest frame is kept: if the consumer is slower
+#     than the source, older frames are dropped instead of queued.
+#   - read() notes when each frame was captured and mark_displayed() notes
+#     when it was shown, giving the capture -> display latency per frame.
+#
+# ReplayCapture has the cv2.VideoCapture methods used by the tracking
+# scripts (read, isOpened, get, set, release), so it can replace it directly.
+#
+# A frame dump is a folder of images (sorted by name) with an optional
+# timestamps.txt holding one capture time in seconds per image. Record one
+# from a camera with:
+#   python replay_source.py record 0 recording_frames/
+
+import glob
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+DEFAULT_FPS = 30
+
+
+class ReplayCapture:
+    def __init__(self, source, fps=None, speed=1.0):
+        """source: video file or frame dump folder; fps: fixed rate instead of original timestamps"""
+        self.source = source
+        self.fixed_fps = fps
+        self.speed = speed
+
+        self.frames_published = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.latencies = []            # (frame index, capture time, display time)
+
+        self._condition = threading.Condition()
+        self._latest = None            # (frame index, frame, capture time)
+        self._last_read_index = -1
+        self._last_capture = None
+        self._finished = False
+        self._stop = threading.Event()
+
+        if os.path.isdir(source):
+            self._open_frame_dump(source)
+        else:
+            self._open_video(source)
+
+        self._thread = threading.Thread(target=self._play, daemon=True)
+        self._thread.start()
+
+    def _open_video(self, path):
+        self._cap = cv2.VideoCapture(path)
+        self._opened = self._cap.isOpened()
+        self._fps = self.fixed_fps or self._cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        self._width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self._height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._paths = None
+
+    def _open_frame_dump(self, folder):
+        self._cap = None
+        self._paths = []
+        for pattern in IMAGE_EXTENSIONS:
+            self._paths.extend(glob.glob(os.path.join(folder, pattern)))
+        self._paths.sort()
+        self._timestamps = None
+        timestamps_path = os.path.join(folder, "timestamps.txt")
+        if os.path.exists(timestamps_path):
+            with open(timestamps_path, "r") as file_object:
+                self._timestamps = [float(line) for line in file_object if line.strip()]
+        self._opened = len(self._paths) > 0
+        self._width = self._height = 0
+        if self._opened:
+            first = cv2.imread(self._paths[0])
+            self._height, self._width = first.shape[:2]
+        if self.fixed_fps:
+            self._fps = self.fixed_fps
+        elif self._timestamps and len(self._timestamps) > 1:
+            self._fps = (len(self._timestamps) - 1) / max(1e-6, self._timestamps[-1] - self._timestamps[0])
+        else:
+            self._fps = DEFAULT_FPS
+
+    def _next_frame(self, index):
+        """Return (frame, source time in seconds) of the next frame, or (None, None) at the end"""
+        if self._paths is not None:
+            if index >= len(self._paths):
+                return None, None
+            frame = cv2.imread(self._paths[index])
+            if self._timestamps is not None and not self.fixed_fps and index < len(self._timestamps):
+                return frame, self._timestamps[index] - self._timestamps[0]
+            return frame, index / self._fps
+
+        ret, frame = self._cap.read()
+        if not ret:
+            return None, None
+        if self.fixed_fps:
+            return frame, index / self._fps
+        return frame, self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    def _play(self):
+        """Background thread: release frames at their timestamps, keeping only the newest"""
+        start = time.perf_counter()
+        first_time = None
+        index = 0
+        while self._opened and not self._stop.is_set():
+            frame, source_time = self._next_frame(index)
+            if frame is None:
+                break
+            if first_time is None:
+                first_time = source_time
+
+            # Wait until this frame's moment in the recording
+            delay = start + (source_time - first_time) / self.speed - time.perf_counter()
+            if delay > 0 and self._stop.wait(delay):
+                break
+
+            with self._condition:
+                if self._latest is not None and self._latest[0] > self._last_read_index:
+                    self.frames_dropped += 1  # Consumer did not take the previous frame
+                self._latest = (index, frame, time.perf_counter())
+                self.frames_published += 1
+                self._condition.notify_all()
+            index += 1
+
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def read(self):
+        """Wait for the next frame the source releases; (False, None) when the replay is over"""
+        with self._condition:
+            while not self._finished and (self._latest is None or self._latest[0] <= self._last_read_index):
+                self._condition.wait()
+            if self._latest is None or self._latest[0] <= self._last_read_index:
+                return False, None
+            index, frame, capture_time = self._latest
+            self._last_read_index = index
+        self._last_capture = (index, capture_time)
+        self.frames_read += 1
+        return True, frame
+
+    def mark_displayed(self):
+        """Record the capture -> display latency of the last frame returned by read()"""
+        if self._last_capture is not None:
+            index, capture_time = self._last_capture
+            self.latencies.append((index, capture_time, time.perf_counter()))
+            self._last_capture = None
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._width
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._height
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self._fps
+        return 0
+
+    def set(self, prop_id, value):
+        # A recording cannot change resolution or FPS like a camera can
+        return False
+
+    def release(self):
+        self._stop.set()
+        self._thread.join()
+        if self._cap is not None:
+            self._cap.release()
+
+    def stats(self):
+        """Frame counts and capture -> display latency summary in milliseconds"""
+        latencies = np.array([(display - capture) * 1000 for _, capture, display in self.latencies])
+        summary = {
+            'frames_published': self.frames_published,
+            'frames_read': self.frames_read,
+            'frames_dropped': self.frames_dropped,
+        }
+        if len(latencies) > 0:
+            summary.update({
+                'latency_mean_ms': float(latencies.mean()),
+                'latency_p50_ms': float(np.percentile(latencies, 50)),
+                'latency_p95_ms': float(np.percentile(latencies, 95)),
+                'latency_max_ms': float(latencies.max()),
+            })
+        return summary
+
+    def save_latency_csv(self, path):
+        """Write one row per displayed frame: frame index, capture and display time, latency"""
+        with open(path, "w") as file_object:
+            file_object.write("frame,capture_time,display_time,latency_ms\n")
+            for index, capture_time, display_time in self.latencies:
+                file_object.write(f"{index},{capture_time:.6f},{display_time:.6f},"
+                                  f"{(display_time - capture_time) * 1000:.3f}\n")
+
+
+def record_frames(camera_index, folder, max_frames=None):
+    """Record camera frames and their capture times into a frame dump folder"""
+    os.makedirs(folder, exist_ok=True)
+    cap = cv2.VideoCapture(camera_index)
+    if not cap.isOpened():
+        print(f"Error: Could not open camera {camera_index}")
+        return False
+
+    print("Recording - press ESC in the window to stop")
+    count = 0
+    with open(os.path.join(folder, "timestamps.txt"), "w") as timestamps:
+        while max_frames is None or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamps.write(f"{time.perf_counter():.6f}\n")
+            cv2.imwrite(os.path.join(folder, f"frame_{count:06d}.jpg"), frame)
+            count += 1
+            cv2.imshow("Recording", frame)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    print(f"✓ Recorded {count} frames to {folder}")
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "record":
+        # python replay_source.py record <camera index> <folder> [max frames]
+        max_frames = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        success = record_frames(int(sys.argv[2]), sys.argv[3], max_frames)
+        sys.exit(0 if success else 1)
+    print("Usage: python replay_source.py record <camera index> <folder> [max frames]")
+    sys.exit(1)
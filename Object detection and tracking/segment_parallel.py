@@ -0,0 +1,253 @@
+"""
+Segment-parallel tracking for long videos
+Run this script to track a multi-hour recording with several worker processes
+
+The video is split into segments that start on keyframes. Each segment also
+processes OVERLAP_FRAMES frames before its own range so its tracker is warmed
+up. Segments are tracked independently, and the track IDs are then stitched
+into one global set by matching tracks that agree in the shared frames.
+
+Everything goes through an output folder, so workers can also run on
+different machines that share it:
+
+  python segment_parallel.py video.mp4 --workers 8           # all on this machine
+  python segment_parallel.py video.mp4 --plan --segments 32  # write plan.json
+  python segment_parallel.py video.mp4 --worker 5            # on any node
+  python segment_parallel.py video.mp4 --stitch              # write tracks.csv
+
+Output: <output>/tracks.csv with frame, track_id, cx, cy, class_id, score
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from centroid_tracker import CentroidTracker, detections_to_objects
+from spatial_index import greedy_assignment, match_points
+
+OVERLAP_FRAMES = 30          # Frames shared by neighbouring segments
+MAX_TRACKING_DISTANCE = 50   # Same gate as object_tracking.py
+MAX_TRAJECTORY_POINTS = 30
+MIN_STITCH_FRAMES = 3        # Overlap frames two tracks must agree on to be joined
+OUTPUT_DIR = "segments_output"
+COLUMNS = ('frame', 'track_id', 'cx', 'cy', 'class_id', 'score')
+
+
+def keyframe_indices(video_path, fps):
+    """Frame indices of keyframes (needs ffprobe), or None if unavailable"""
+    if shutil.which("ffprobe") is None:
+        return None
+    command = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+               "-show_entries", "frame=pts_time", "-of", "csv=p=0", video_path]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    times = [float(line.strip().strip(",")) for line in output.splitlines() if line.strip().strip(",")]
+    return sorted(set(int(round(t * fps)) for t in times)) or None
+
+
+def plan_segments(video_path, segment_count, overlap=OVERLAP_FRAMES):
+    """Split a video into segments whose decode start is on a keyframe"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source '{video_path}'")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    cap.release()
+
+    keyframes = keyframe_indices(video_path, fps)
+    segment_count = max(1, min(segment_count, frame_count // max(1, 4 * overlap)))
+
+    segments = []
+    core_start = 0
+    for index in range(segment_count):
+        core_end = frame_count if index == segment_count - 1 else (index + 1) * frame_count // segment_count
+        start = max(0, core_start - overlap)
+        if keyframes and index > 0:
+            # Start decoding at the last keyframe before the overlap
+            earlier = [k for k in keyframes if k <= start]
+            start = earlier[-1] if earlier else 0
+        segments.append({'index': index, 'start': start, 'core_start': core_start, 'core_end': core_end})
+        core_start = core_end
+
+    return {'video': os.path.abspath(video_path), 'frame_count': frame_count, 'fps': fps,
+            'overlap': overlap, 'keyframe_aligned': keyframes is not None, 'segments': segments}
+
+
+def segment_path(output_dir, index):
+    return os.path.join(output_dir, f"segment_{index:04d}.npz")
+
+
+def process_segment(video_path, segment, output_dir, threads=None):
+    """Track one segment and save every tracked position from its start to core_end"""
+    result_path = segment_path(output_dir, segment['index'])
+    if os.path.exists(result_path):
+        print(f"✓ Segment {segment['index']} already done (skipping)")
+        return result_path
+
+    if threads:
+        cv2.setNumThreads(threads)
+
+    from object_detection import ObjectDetection
+    od = ObjectDetection()
+    tracker = CentroidTracker(od.classes, max_distance=MAX_TRACKING_DISTANCE,
+                              max_trajectory_points=MAX_TRAJECTORY_POINTS)
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, segment['start'])
+    rows = []
+
+    for frame_index in range(segment['start'], segment['core_end']):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        (class_ids, scores, boxes) = od.detect(frame)
+        tracker.update(detections_to_objects(class_ids, scores, boxes))
+
+        for object_id, (cx, cy) in tracker.tracking_objects.items():
+            info = tracker.object_info[object_id]
+            rows.append((frame_index, object_id, cx, cy, info['class_id'], info['score']))
+    cap.release()
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+    tmp_path = result_path + ".tmp.npz"
+    np.savez(tmp_path, **{name: table[:, i] for i, name in enumerate(COLUMNS)})
+    # Rename last so other nodes never read a half-written result
+    os.replace(tmp_path, result_path)
+    print(f"✓ Segment {segment['index']} done: frames {segment['start']}-{segment['core_end'] - 1}")
+    return result_path
+
+
+def load_segment(output_dir, index):
+    with np.load(segment_path(output_dir, index)) as data:
+        return {name: data[name] for name in COLUMNS}
+
+
+def overlap_votes(previous, current, frames):
+    """Count overlap frames where a previous-segment track and a current-segment track coincide"""
+    votes = {}
+    for frame_index in frames:
+        prev_rows = np.flatnonzero(previous['frame'] == frame_index)
+        cur_rows = np.flatnonzero(current['frame'] == frame_index)
+        prev_points = np.stack([previous['cx'][prev_rows], previous['cy'][prev_rows]], axis=1)
+        cur_points = np.stack([current['cx'][cur_rows], current['cy'][cur_rows]], axis=1)
+        for prev_index, cur_index in match_points(prev_points, cur_points, MAX_TRACKING_DISTANCE):
+            pair = (int(previous['track_id'][prev_rows[prev_index]]), int(current['track_id'][cur_rows[cur_index]]))
+            votes[pair] = votes.get(pair, 0) + 1
+    return votes
+
+
+def stitch(plan, output_dir):
+    """Merge segment results into one track set with global IDs"""
+    segments = plan['segments']
+    next_global_id = 0
+    previous = None
+    previous_ids = {}
+    merged = []
+
+    for segment in segments:
+        current = load_segment(output_dir, segment['index'])
+        current_ids = {}
+
+        if previous is not None:
+            # Frames tracked by both the previous segment (core) and this one (warm-up)
+            frames = range(segment['start'], segment['core_start'])
+            votes = overlap_votes(previous, current, frames)
+            # A previous track seen only in its own warm-up has no global ID to pass on
+            pairs = [(pair, count) for pair, count in votes.items()
+                     if count >= MIN_STITCH_FRAMES and pair[0] in previous_ids]
+            if pairs:
+                prev_local = np.array([pair[0] for pair, _ in pairs])
+                cur_local = np.array([pair[1] for pair, _ in pairs])
+                # Most agreeing pairs first, each track joined at most once
+                rows, cols = greedy_assignment(prev_local, cur_local, -np.array([c for _, c in pairs], dtype=float))
+                for prev_id, cur_id in zip(rows.tolist(), cols.tolist()):
+                    current_ids[cur_id] = previous_ids[prev_id]
+
+        # Keep only this segment's own frames, the overlap belongs to the previous one.
+        # Tracks seen only in the warm-up are dropped and get no global ID.
+        core = current['frame'] >= segment['core_start']
+        for local_id in np.unique(current['track_id'][core]).astype(int).tolist():
+            if local_id not in current_ids:
+                current_ids[local_id] = next_global_id
+                next_global_id += 1
+        global_ids = np.array([current_ids[int(i)] for i in current['track_id'][core]], dtype=np.float64)
+        merged.append(np.stack([current['frame'][core], global_ids, current['cx'][core], current['cy'][core],
+                                current['class_id'][core], current['score'][core]], axis=1))
+
+        previous, previous_ids = current, current_ids
+
+    table = np.concatenate(merged) if merged else np.zeros((0, len(COLUMNS)))
+    tracks_path = os.path.join(output_dir, "tracks.csv")
+    np.savetxt(tracks_path, table, delimiter=",", header=",".join(COLUMNS), comments="",
+               fmt=["%d", "%d", "%d", "%d", "%d", "%.4f"])
+    return tracks_path, len(np.unique(table[:, 1]))
+
+
+def load_plan(output_dir):
+    with open(os.path.join(output_dir, "plan.json"), "r") as file_object:
+        return json.load(file_object)
+
+
+def save_plan(plan, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "plan.json"), "w") as file_object:
+        json.dump(plan, file_object, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segment-parallel object tracking")
+    parser.add_argument("video", help="Video file to process")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Shared output folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--segments", type=int, default=None, help="Number of segments (default: workers)")
+    parser.add_argument("--overlap", type=int, default=OVERLAP_FRAMES)
+    parser.add_argument("--plan", action="store_true", help="Only write plan.json")
+    parser.add_argument("--worker", type=int, default=None, help="Only process this segment index")
+    parser.add_argument("--stitch", action="store_true", help="Only stitch finished segments")
+    args = parser.parse_args()
+
+    if args.worker is not None or args.stitch:
+        plan = load_plan(args.output)
+    else:
+        plan = plan_segments(args.video, args.segments or args.workers, args.overlap)
+        save_plan(plan, args.output)
+        aligned = "keyframe-aligned" if plan['keyframe_aligned'] else "not keyframe-aligned (ffprobe not found)"
+        print(f"Planned {len(plan['segments'])} segments, {aligned}")
+        if args.plan:
+            return True
+
+    if args.worker is not None:
+        process_segment(plan['video'], plan['segments'][args.worker], args.output)
+        return True
+
+    if not args.stitch:
+        threads = max(1, (os.cpu_count() or 1) // args.workers)
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(process_segment, plan['video'], segment, args.output, threads)
+                       for segment in plan['segments']]
+            for future in futures:
+                future.result()
+
+    missing = [s['index'] for s in plan['segments'] if not os.path.exists(segment_path(args.output, s['index']))]
+    if missing:
+        print(f"✗ Segments not finished yet: {missing}")
+        return False
+
+    tracks_path, track_count = stitch(plan, args.output)
+    print(f"\n✓ Tracks saved: {tracks_path}")
+    print(f"Total unique objects tracked: {track_count}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,115 @@
+# Spatial Index Module
+# Author: Suhas Uppala
+# GitHub: https://github.com/Suhas-Uppala
+# Educational Purpose Only
+#
+# Uniform grid over points for matching tracked objects to new detections.
+# The tracker only matches pairs closer than a distance gate (50 px for video,
+# 80 px for the live camera), so comparing every track with every detection is
+# wasted work when there are hundreds or thousands of objects per frame.
+# With a grid cell as large as the gate, a pair can only match if the two
+# points sit in the same or neighbouring cells, so only those pairs are scored.
+# The result is a sparse list of (track, detection, distance) candidates that
+# is handed to a greedy nearest-first assignment.
+
+import numpy as np
+
+# Offsets of a cell and its 8 neighbours
+NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+def cell_keys(cells):
+    """Pack (cx, cy) integer cell coordinates into one sortable int64 key"""
+    return cells[..., 0] * (1 << 32) + (cells[..., 1] + (1 << 31))
+
+
+class GridIndex:
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.points = np.zeros((0, 2), dtype=np.float64)
+        self.sorted_keys = np.zeros(0, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+
+    def build(self, points):
+        """Index a set of (x, y) points, replacing the previous frame's points"""
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        keys = cell_keys(np.floor(self.points / self.cell_size).astype(np.int64))
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        return self
+
+    def query_pairs(self, query_points, radius):
+        """Return (query_indices, point_indices, distances) of all pairs closer than radius"""
+        if radius > self.cell_size:
+            raise ValueError("radius must not be larger than the grid cell size")
+
+        query_points = np.asarray(query_points, dtype=np.float64).reshape(-1, 2)
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+        if len(query_points) == 0 or len(self.points) == 0:
+            return empty
+
+        # Keys of the 3x3 cell block around every query point
+        query_cells = np.floor(query_points / self.cell_size).astype(np.int64)
+        neighbour_keys = cell_keys(query_cells[:, None, :] + NEIGHBOUR_OFFSETS[None, :, :]).reshape(-1)
+
+        # Range of indexed points falling in each neighbour cell
+        starts = np.searchsorted(self.sorted_keys, neighbour_keys, side="left")
+        ends = np.searchsorted(self.sorted_keys, neighbour_keys, side="right")
+        counts = ends - starts
+        total = int(counts.sum())
+        if total == 0:
+            return empty
+
+        # Expand the ranges into flat candidate pairs without a Python loop
+        query_indices = np.repeat(np.arange(len(neighbour_keys)) // len(NEIGHBOUR_OFFSETS), counts)
+        range_offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        point_indices = self.order[np.repeat(starts, counts) + range_offsets]
+
+        deltas = query_points[query_indices] - self.points[point_indices]
+        distances = np.hypot(deltas[:, 0], deltas[:, 1])
+        inside = distances < radius
+        return query_indices[inside], point_indices[inside], distances[inside]
+
+
+def greedy_assignment(rows, cols, distances):
+    """One-to-one assignment of sparse candidate pairs, closest pairs first
+
+    Gives the same result as walking the pairs sorted by distance and keeping
+    every pair whose row and column are still free, but accepts whole batches
+    of non-conflicting pairs per round.
+    """
+    order = np.argsort(distances, kind="stable")
+    rows, cols = rows[order], cols[order]
+    matched_rows = []
+    matched_cols = []
+
+    while len(rows) > 0:
+        # A pair is safe to accept if it is the closest remaining pair for both
+        # its row and its column
+        first_row = np.zeros(len(rows), dtype=bool)
+        first_row[np.unique(rows, return_index=True)[1]] = True
+        first_col = np.zeros(len(cols), dtype=bool)
+        first_col[np.unique(cols, return_index=True)[1]] = True
+        accepted = first_row & first_col
+
+        matched_rows.append(rows[accepted])
+        matched_cols.append(cols[accepted])
+
+        remaining = ~(np.isin(rows, rows[accepted]) | np.isin(cols, cols[accepted]))
+        rows, cols = rows[remaining], cols[remaining]
+
+    if not matched_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+def match_points(track_points, detection_points, max_distance):
+    """Match tracked points to detected points closer than max_distance
+
+    Returns a list of (track_index, detection_index) pairs, each track and each
+    detection used at most once.
+    """
+    index = GridIndex(max_distance).build(detection_points)
+    rows, cols, distances = index.query_pairs(track_points, max_distance)
+    rows, cols = greedy_assignment(rows, cols, distances)
+    return list(zip(rows.tolist(), cols.tolist()))